@@ -6,18 +6,39 @@ Author: Dominik Krupke
 Version: 2023-11-11
 """
 
+import contextlib
 import inspect
+import json
 import os
+import platform
+import queue
+import statistics
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import typing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from tqdm import tqdm  # pip install tqdm
 
 # A dictionary with all tests that should be run.
 _check_list = {}
 
+# The subprocess writes its peak memory to the file given by this environment variable.
+_RUSAGE_ENV = "ALGLAB_RUSAGE_FILE"
+
+# Keeps the output of parallel tests from interleaving.
+_print_lock = threading.Lock()
+
+# Every run of a test is appended as a JSON line to this file. It lies next to this module,
+# so the history is the same from whatever directory the checks are started.
+_history_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime_history.jsonl")
+_history_lock = threading.Lock()
+# Number of passed runs on the same host whose median a run is compared with, see `max_slowdown`.
+_ROLLING_WINDOW = 5
+
 
 class _TestCase:
     def __init__(self, func, max_runtime_s):
@@ -27,6 +48,8 @@ class _TestCase:
         self.func_file = os.path.abspath(inspect.getfile(func))
 
         self.max_runtime_s = max_runtime_s
+        # peak memory of the last run in MB, None if it could not be measured
+        self.peak_rss_mb = None
 
     def run(self):
         """
@@ -41,50 +64,93 @@ class _TestCase:
         outs = outs.decode("utf-8")
         errs = errs.decode("utf-8")
         # print output
-        print(outs)
-        print(errs)
-        print(f"Test '{self.func_name}' timed out after {self.max_runtime_s} seconds.")
+        with _print_lock:
+            print(outs)
+            print(errs)
+            print(
+                f"Test '{self.func_name}' timed out after {self.max_runtime_s} seconds."
+            )
 
     def _on_error(self, outs, errs):
         # decode output
         outs = outs.decode("utf-8")
         errs = errs.decode("utf-8")
         # print output
-        print(outs)
-        print(errs)
-        print(f"Test '{self.func_name}' failed.")
+        with _print_lock:
+            print(outs)
+            print(errs)
+            print(f"Test '{self.func_name}' failed.")
 
-    def _create_subprocess(self):
+    def _create_subprocess(self, cpus=None, rusage_file=None):
         cmd = [
             sys.executable,
             os.path.abspath(__file__),
             self.func_file,
             self.func_name,
         ]
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        env = dict(os.environ)
+        if rusage_file is not None:
+            env[_RUSAGE_ENV] = rusage_file
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+        )
+        if cpus:
+            # pin the test to its own cores. This happens in the parent, as preexec_fn is not safe with the
+            # threads of the parallel runner. The interpreter is still starting up, so the solver threads
+            # it starts later inherit the affinity.
+            # the test may already have exited
+            with contextlib.suppress(ProcessLookupError):
+                os.sched_setaffinity(proc.pid, cpus)
         return proc
 
-    def run_in_subprocess(self):
+    def run_in_subprocess(self, cpus=None):
         """
         Run in subprocess with time limit. Return True if the function
         terminates without error in time. Capture the output of the
         function and print it in case of an error.
+        If cpus is given, the subprocess is pinned to these cores.
         """
-        print(f"Running test '{self.func_name}'...")
+        with _print_lock:
+            print(f"Running test '{self.func_name}'...")
         assert os.path.exists(self.func_file)
-        # create subprocess
-        proc = self._create_subprocess()
-        # wait for process to terminate
+        fd, rusage_file = tempfile.mkstemp(prefix="alglab_rusage_")
+        os.close(fd)
         try:
-            outs, errs = proc.communicate(timeout=self.max_runtime_s)
-        except subprocess.TimeoutExpired:
-            self._on_timeout(proc)
-            return False
-        # check if there was an error
-        if proc.returncode != 0:
-            self._on_error(outs, errs)
-            return False
-        return True
+            # create subprocess
+            proc = self._create_subprocess(cpus, rusage_file)
+            # wait for process to terminate
+            try:
+                outs, errs = proc.communicate(timeout=self.max_runtime_s)
+            except subprocess.TimeoutExpired:
+                self._on_timeout(proc)
+                return False
+            finally:
+                self.peak_rss_mb = _read_peak_rss(rusage_file)
+            # check if there was an error
+            if proc.returncode != 0:
+                self._on_error(outs, errs)
+                return False
+            return True
+        finally:
+            os.remove(rusage_file)
+
+
+def _read_peak_rss(rusage_file) -> typing.Optional[float]:
+    with open(rusage_file) as f:
+        content = f.read().strip()
+    return float(content) if content else None
+
+
+def _write_peak_rss(rusage_file):
+    import resource
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(rusage_file, "w") as f:
+        f.write(f"{peak_rss_mb:.1f}")
 
 
 def FAIL(msg):
@@ -119,29 +185,205 @@ def mandatory_testcase(max_runtime_s=900):
     return decorator
 
 
-def _run_with_runtime_measurement(func_name) -> typing.Tuple[bool, float]:
+def _host_info() -> typing.Dict[str, typing.Any]:
+    return {
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def _git_revision(path) -> typing.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(path),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _read_history() -> typing.List[typing.Dict[str, typing.Any]]:
+    # under the lock, so a line that is appended by a parallel test is never read half written
+    with _history_lock:
+        if not os.path.exists(_history_file):
+            return []
+        with open(_history_file) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def _append_history(entry):
+    with _history_lock, open(_history_file, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def _rolling_median(func_name, host) -> typing.Optional[float]:
+    runtimes = [
+        entry["runtime"]
+        for entry in _read_history()
+        if entry["test"] == func_name and entry["host"] == host and entry["passed"]
+    ][-_ROLLING_WINDOW:]
+    # a median of fewer runs is too noisy to judge a slowdown
+    if len(runtimes) < 3:
+        return None
+    return statistics.median(runtimes)
+
+
+def _run_with_runtime_measurement(
+    func_name, cpus=None, max_slowdown=None
+) -> typing.Tuple[bool, float]:
+    """
+    Runs a test in a subprocess and appends the run to the history. A passed test fails if it is more than
+    `max_slowdown` percent slower than the median of its last _ROLLING_WINDOW passed runs on the same host.
+    """
+    test_case = _check_list[func_name]
     start_time = time.time()
-    succ = _check_list[func_name].run_in_subprocess()
+    succ = test_case.run_in_subprocess(cpus)
     end_time = time.time()
     execution_time = end_time - start_time
+
+    entry = {
+        "test": func_name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runtime": execution_time,
+        "peak_rss_mb": test_case.peak_rss_mb,
+        "git_revision": _git_revision(test_case.func_file),
+        "passed": succ,
+        **_host_info(),
+    }
+    if succ and max_slowdown is not None:
+        median = _rolling_median(func_name, entry["host"])
+        if median is not None and execution_time > median * (1 + max_slowdown / 100):
+            with _print_lock:
+                print(
+                    f"Test '{func_name}' took {execution_time:.1f}s, which is more than "
+                    f"{max_slowdown:g}% over its rolling median of {median:.1f}s."
+                )
+                print(f"Test '{func_name}' failed.")
+            # slow runs do not count for the median, so retries cannot hide the regression
+            succ = False
+            entry["passed"] = False
+            entry["regression"] = True
+    _append_history(entry)
     return succ, execution_time
 
 
-def run_all_checks():
+def print_history_report():
+    """
+    Print the runtime trend of every test on this host.
+    """
+    host = platform.node()
+    history = [entry for entry in _read_history() if entry["host"] == host]
+    if not history:
+        print(f"No runtime history in '{_history_file}' for host '{host}'.")
+        return
+    print(f"Runtime history of host '{host}' from '{_history_file}':")
+    print(
+        f"{'Test':40} {'Runs':>5} {'Last':>8} {'Median':>8} {'Min':>8} {'Max':>8} {'Trend':>8} {'Peak memory':>12}  Revision"
+    )
+    for func_name in dict.fromkeys(entry["test"] for entry in history):
+        runs = [
+            entry for entry in history if entry["test"] == func_name and entry["passed"]
+        ]
+        if not runs:
+            print(f"{func_name:40} {0:5d}")
+            continue
+        runtimes = [entry["runtime"] for entry in runs]
+        last = runs[-1]
+        previous = runtimes[:-1][-_ROLLING_WINDOW:]
+        # relative change of the last run to the rolling median before it
+        trend = (
+            f"{(last['runtime'] / statistics.median(previous) - 1) * 100:+.0f}%"
+            if previous
+            else "-"
+        )
+        memory = (
+            f"{last['peak_rss_mb']:.0f} MB" if last.get("peak_rss_mb") is not None else "-"
+        )
+        print(
+            f"{func_name:40} {len(runs):5d} {last['runtime']:7.1f}s {statistics.median(runtimes):7.1f}s "
+            f"{min(runtimes):7.1f}s {max(runtimes):7.1f}s {trend:>8} {memory:>12}  {last.get('git_revision') or '-'}"
+        )
+
+
+def _cpu_slots(workers) -> typing.List[typing.Optional[typing.Set[int]]]:
+    """
+    Split the available cores into one disjoint, equally sized set per worker,
+    such that parallel tests do not compete for cores and their runtimes stay comparable.
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * workers
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = len(cpus) // workers
+    if per_worker == 0:
+        # more workers than cores, pinning would not be fair
+        return [None] * workers
+    return [
+        set(cpus[i * per_worker : (i + 1) * per_worker]) for i in range(workers)
+    ]
+
+
+def _print_result_table(results):
+    print(f"{'Test':40} {'Status':8} {'Runtime':>10} {'Peak memory':>12}")
+    for func_name, (succ, exc_time) in results.items():
+        peak_rss_mb = _check_list[func_name].peak_rss_mb
+        memory = f"{peak_rss_mb:.0f} MB" if peak_rss_mb is not None else "-"
+        status = "passed" if succ else "failed"
+        print(f"{func_name:40} {status:8} {exc_time:9.1f}s {memory:>12}")
+
+
+def _run_parallel(workers, max_slowdown=None) -> typing.Dict[str, typing.Tuple[bool, float]]:
+    slots = queue.Queue()
+    for cpus in _cpu_slots(workers):
+        slots.put(cpus)
+
+    def run(func_name):
+        # every running test holds one slot of cores
+        cpus = slots.get()
+        try:
+            return _run_with_runtime_measurement(func_name, cpus, max_slowdown)
+        finally:
+            slots.put(cpus)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, func_name): func_name for func_name in _check_list}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Progress"):
+            results[futures[future]] = future.result()
+    # keep the order of the check list
+    return {func_name: results[func_name] for func_name in _check_list}
+
+
+def run_all_checks(workers=1, max_slowdown=None):
     """
     Run all checks in subprocesses with a timeout.
+    With more than one worker, the checks run in parallel on disjoint sets of cores
+    and failed checks are retried one after another afterwards.
+    With `max_slowdown`, a check that is this many percent slower than its rolling median fails.
     """
     print("Running all checks...")
-    for func_name in tqdm(_check_list, desc="Progress"):
-        succ, exc_time = _run_with_runtime_measurement(func_name)
+    if workers > 1:
+        results = _run_parallel(workers, max_slowdown)
+    else:
+        results = {func_name: None for func_name in _check_list}
+    for func_name in tqdm(_check_list, desc="Progress", disable=workers > 1):
+        if results[func_name] is None:
+            results[func_name] = _run_with_runtime_measurement(func_name, max_slowdown=max_slowdown)
+        succ, exc_time = results[func_name]
         while not succ:
             print("========================================")
             print(
                 "Please fix the error and press enter to try again. Press Ctrl+C to abort."
             )
             input()
-            succ, exc_time = _run_with_runtime_measurement(func_name)
+            succ, exc_time = _run_with_runtime_measurement(func_name, max_slowdown=max_slowdown)
+        results[func_name] = succ, exc_time
         print(f"Test '{func_name}' passed in {exc_time:.1f}s.")
+    _print_result_table(results)
     print("All checks passed.")
 
 
@@ -149,10 +391,26 @@ def main():
     """
     This function is the entry point for running tests.
     If a single test name is provided as a command line argument, only that test will be run.
-    Otherwise, all available tests will be run.
+    Otherwise, all available tests will be run, in parallel with `--workers N`.
+    With `--max-slowdown P`, a test fails if it is more than P percent slower than
+    its rolling median, and `--history-report` prints the runtime trends.
     """
-    if len(sys.argv) == 2:
-        func_name = sys.argv[1]
+    args = sys.argv[1:]
+    workers = 1
+    max_slowdown = None
+    if "--workers" in args:
+        position = args.index("--workers")
+        workers = int(args[position + 1])
+        del args[position : position + 2]
+    if "--max-slowdown" in args:
+        position = args.index("--max-slowdown")
+        max_slowdown = float(args[position + 1])
+        del args[position : position + 2]
+    if "--history-report" in args:
+        print_history_report()
+        return
+    if len(args) == 1:
+        func_name = args[0]
         if func_name not in _check_list:
             print(f"Test '{func_name}' not found.")
             print("Available tests:")
@@ -169,11 +427,16 @@ def main():
         print(
             "Use this to debug a single test. It will also show the output of the test."
         )
+        print("Use --workers N to run the tests in N parallel processes.")
+        print(
+            "Use --max-slowdown P to fail tests that are P percent slower than their rolling median."
+        )
+        print("Use --history-report to show the runtime trends of the tests.")
         print("Available tests:")
         for func_name in _check_list:
             print(f"  {func_name}")
         print("-" * 80)
-        run_all_checks()
+        run_all_checks(workers, max_slowdown)
 
 
 if __name__ == "__main__":
@@ -181,6 +444,11 @@ if __name__ == "__main__":
     # this is the entry point for running tests in a subprocess
     path_to_py = sys.argv[1]  # path to python file with function
     func_name = sys.argv[2]  # name of function to run
+    # report the peak memory to the parent process, also if the check fails
+    if os.environ.get(_RUSAGE_ENV):
+        import atexit
+
+        atexit.register(_write_peak_rss, os.environ[_RUSAGE_ENV])
     glob = dict(globals())  # copy globals
     # set __name__ to None such that the file is not executed
     glob["__name__"] = None
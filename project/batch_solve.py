@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+from solution_io import write_solution
+from solver_pool import SolverPool
+
+# Solves many independent instances on a pool of worker processes. Every worker holds one Gurobi license seat
+# and uses `threads_per_worker` threads, the number of workers is chosen such that the threads of all workers
+# fit into the available cores. The results are yielded as soon as an instance is finished and written to
+# <out_dir>/<instance>.solution.jsonl and <out_dir>/<instance>.stats.json, where <instance> is the path of the
+# instance relative to the common directory of all instances, so courseA/SEP_data.json and courseB/SEP_data.json
+# do not overwrite each other.
+#
+# usage: python batch_solve.py instances/*.json --threads-per-worker 2 --license-seats 4 --out-dir batch_results
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def number_of_workers(
+    number_instances: int,
+    threads_per_worker: int,
+    workers: Optional[int] = None,
+    license_seats: Optional[int] = None,
+) -> int:
+    """
+    The number of workers such that workers * threads_per_worker does not exceed the cores and at most
+    one worker per license seat and instance is started.
+    """
+    limit = max(1, available_cores() // threads_per_worker)
+    if workers is not None:
+        limit = min(limit, workers)
+    if license_seats is not None:
+        limit = min(limit, license_seats)
+    return max(1, min(limit, number_instances))
+
+
+def output_names(paths: List[str]) -> Dict[str, str]:
+    """
+    Maps every instance path to its path relative to the common directory of all instances, without extension.
+    """
+    directories = [os.path.dirname(os.path.abspath(path)) for path in paths]
+    common = os.path.commonpath(directories) if directories else ""
+    names = {
+        path: os.path.splitext(os.path.relpath(os.path.abspath(path), common))[0]
+        for path in paths
+    }
+    if len(set(names.values())) < len(names):
+        raise ValueError("Some instances are given more than once.")
+    return names
+
+
+def solve_many(
+    paths: List[str],
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    license_seats: Optional[int] = None,
+    out_dir: str = "batch_results",
+    timeout: Optional[float] = None,
+    **options,
+) -> Iterator[Dict]:
+    """
+    Solves the instance files in parallel and yields one result per instance in the order they finish.
+    Raises a `TimeoutError` if no instance finishes within `timeout` seconds, the remaining instances are cancelled.
+    The options are passed to the `SepSolver`.
+    """
+    names = output_names(paths)
+    number = number_of_workers(len(paths), threads_per_worker, workers, license_seats)
+    # a TimeoutError or a caller that stops iterating (GeneratorExit) leaves the block with an exception,
+    # then the pool is terminated instead of solving the remaining instances
+    with SolverPool(workers=number, env_params={"Threads": threads_per_worker}) as pool:
+        jobs = {}
+        for path in paths:
+            with open(path) as f:
+                job_id = pool.submit(f.read(), **options)
+            jobs[job_id] = path
+
+        for job_id in pool.as_completed(jobs, timeout=timeout):
+            path = jobs[job_id]
+            job = pool.status(job_id)
+            name = os.path.join(out_dir, names[path])
+            os.makedirs(os.path.dirname(name), exist_ok=True)
+            result = {
+                "instance": path,
+                "status": job["status"],
+                # from the moment a worker took the instance, the time in the queue does not count
+                "wall_time": job["finished"] - job["started"] if job["started"] is not None else 0.0,
+                "stage_stats": job["stage_stats"],
+                "error": job["error"],
+                "solution_file": None,
+            }
+            if job["status"] == "done":
+                result["solution_file"] = f"{name}.solution.jsonl"
+                write_solution(pool.solution(job_id), result["solution_file"])
+            result["stats_file"] = f"{name}.stats.json"
+            with open(result["stats_file"], "w") as f:
+                json.dump(result, f, indent=2)
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many SEP instances in parallel.")
+    parser.add_argument("instances", nargs="+")
+    parser.add_argument("--workers", type=int, help="default: as many as the cores and license seats allow")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--license-seats", type=int, help="number of Gurobi licenses that may be used at once")
+    parser.add_argument("--out-dir", default="batch_results")
+    parser.add_argument("--timeout", type=float, help="abort if no instance finishes within this many seconds")
+    parser.add_argument("--lazy-friends", action="store_true")
+    parser.add_argument("--param-dir", help="directory with tuned <stage>.prm files")
+    args = parser.parse_args()
+
+    options = {"lazy_friends": args.lazy_friends}
+    if args.param_dir:
+        from solver import load_stage_params
+
+        options["stage_params"] = load_stage_params(args.param_dir)
+
+    for result in solve_many(
+        args.instances,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        license_seats=args.license_seats,
+        out_dir=args.out_dir,
+        timeout=args.timeout,
+        **options,
+    ):
+        print(f"{result['instance']:50} {result['status']:10} {result['wall_time']:8.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+from solver_stages import STAGES
+
+# Runs a matrix of solver configurations x instances x seeds. Every run happens in a fresh process, so the
+# peak RSS belongs to that run only. The results are written as CSV and JSON. With --compare the results
+# are checked against a stored baseline and regressions are reported.
+#
+# usage: python benchmark_runner.py --seeds 3 --out benchmark_results
+#        python benchmark_runner.py --compare benchmark_baseline.json --out benchmark_results
+
+DEFAULT_CONFIGS = [
+    {"name": "default"},
+    {"name": "lazy_friends", "lazy_friends": True},
+]
+
+# objectives that are maximized, the optimal size deviation is minimized
+MAXIMIZED = ("rating", "programming", "friends")
+
+
+def _run(config, filepath: str, seed: int, connection):
+    """
+    Builds and solves one instance in the current process and sends the measurements through the connection.
+    """
+    from data_schema import Instance
+    from solver import SepSolver, load_stage_params
+
+    with open(filepath) as f:
+        instance: Instance = Instance.model_validate_json(f.read())
+
+    params = {"OutputFlag": 0, "Seed": seed, **config.get("params", {})}
+    stage_params = load_stage_params(config["param_dir"]) if config.get("param_dir") else None
+
+    start = time.time()
+    solver = SepSolver(
+        instance,
+        lazy_friends=config.get("lazy_friends", False),
+        params=params,
+        stage_params=stage_params,
+    )
+    solver._model.update()
+    build_time = time.time() - start
+    num_vars = solver._model.NumVars
+    num_constrs = solver._model.NumConstrs
+
+    start = time.time()
+    solution = solver.solve()
+    solve_time = time.time() - start
+
+    row = {
+        "config": config["name"],
+        "instance": os.path.basename(filepath),
+        "seed": seed,
+        "feasible": solution is not None,
+        "build_time": build_time,
+        "solve_time": solve_time,
+        "num_vars": num_vars,
+        "num_constrs": num_constrs,
+        "node_count": 0,
+    }
+    for stage in STAGES:
+        stats = solver.stage_stats.get(stage, {})
+        row[f"{stage}_time"] = stats.get("runtime")
+        row[f"{stage}_objective"] = stats.get("objective")
+        row[f"{stage}_gap"] = stats.get("mip_gap")
+        row["node_count"] += stats.get("node_count") or 0
+    # ru_maxrss is reported in kilobytes on Linux
+    row["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    solver.dispose()
+    connection.send(row)
+    connection.close()
+
+
+def run_benchmark(configs, filepaths, seeds):
+    context = mp.get_context("spawn")
+    rows = []
+    for config in configs:
+        for filepath in filepaths:
+            for seed in seeds:
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=_run, args=(config, filepath, seed, sender))
+                process.start()
+                sender.close()
+                try:
+                    row = receiver.recv()
+                except EOFError:
+                    # the run crashed before sending its results
+                    row = {
+                        "config": config["name"],
+                        "instance": os.path.basename(filepath),
+                        "seed": seed,
+                        "feasible": False,
+                    }
+                process.join()
+                print(
+                    f"{row['config']:15} {row['instance']:45} seed {seed}: "
+                    f"{row.get('solve_time') or 0:.2f}s, {row.get('peak_rss_mb') or 0:.0f} MB"
+                )
+                rows.append(row)
+    return rows
+
+
+def write_results(rows, out: str):
+    with open(f"{out}.json", "w") as f:
+        json.dump(rows, f, indent=2)
+    columns = []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+    with open(f"{out}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def compare(rows, baseline_rows, tolerance: float, min_seconds: float):
+    """
+    Returns the regressions of the rows compared to the baseline rows with the same configuration, instance and seed.
+    """
+    baseline = {(row["config"], row["instance"], row["seed"]): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        base = baseline.get((row["config"], row["instance"], row["seed"]))
+        if base is None:
+            continue
+        name = f"{row['config']}/{row['instance']}/seed {row['seed']}"
+        if base.get("feasible") and not row.get("feasible"):
+            regressions.append(f"{name}: no solution anymore")
+            continue
+        for column in ("build_time", "solve_time"):
+            if row.get(column) is None or base.get(column) is None:
+                continue
+            if row[column] > base[column] * (1 + tolerance) and row[column] - base[column] > min_seconds:
+                regressions.append(f"{name}: {column} {base[column]:.2f}s -> {row[column]:.2f}s")
+        if row.get("peak_rss_mb") and base.get("peak_rss_mb") and row["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {base['peak_rss_mb']:.0f} MB -> {row['peak_rss_mb']:.0f} MB")
+        for stage in STAGES:
+            value, base_value = row.get(f"{stage}_objective"), base.get(f"{stage}_objective")
+            if value is None or base_value is None:
+                continue
+            worse = value < base_value - 1e-6 if stage in MAXIMIZED else value > base_value + 1e-6
+            if worse:
+                regressions.append(f"{name}: {stage} objective {base_value} -> {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SEP solver configurations.")
+    parser.add_argument("instances", nargs="*", help="instance files, default: ./instances/*.json")
+    parser.add_argument("--configs", help="JSON file with a list of configurations (name, lazy_friends, param_dir, params)")
+    parser.add_argument("--seeds", type=int, default=1)
+    parser.add_argument("--out", default="benchmark_results", help="prefix of the CSV and JSON result files")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown and memory growth")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="slowdowns below this many seconds are ignored")
+    args = parser.parse_args()
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+    filepaths = args.instances or sorted(glob.glob("./instances/*.json"))
+
+    rows = run_benchmark(configs, filepaths, list(range(args.seeds)))
+    write_results(rows, args.out)
+    print(f"Results written to {args.out}.csv and {args.out}.json")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline_rows = json.load(f)
+        regressions = compare(rows, baseline_rows, args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions compared to the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-import matplotlib.pyplot as plt
-import networkx as nx
-import numpy as np
+from typing import TYPE_CHECKING, Optional
+
 from data_schema import Instance, Solution
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+
+# numpy, matplotlib and networkx are imported by the methods that need them, so importing this module is cheap
+if TYPE_CHECKING:
+    from metrics import Metrics
 
 
 class Benchmarks(BaseModel):
     instance: Instance
     solution: Solution
 
+    _metrics: Optional["Metrics"] = PrivateAttr(default=None)
+    _instance_hash: Optional[str] = PrivateAttr(default=None)
+
     def log(self):
         #logger = logging.getLogger('logger')
 
@@ -28,158 +34,148 @@ class Benchmarks(BaseModel):
         #self.log_programming_requirements()
         self.log_opt_sizes()
 
+    @property
+    def metrics(self) -> "Metrics":
+        # computed on first use and shared by all log methods
+        if self._metrics is None:
+            from metrics import Metrics
+
+            self._metrics = Metrics(self.instance, self.solution)
+        return self._metrics
+
+    @property
+    def instance_hash(self) -> str:
+        # key of the cached layouts, hashing the instance dumps it completely, so it is done once
+        if self._instance_hash is None:
+            from friend_graph import instance_hash
+
+            self._instance_hash = instance_hash(self.instance)
+        return self._instance_hash
+
     def log_rating_sums(self):
         # plot bar chart for student ratings in solution
-        ratings = [1, 2, 3, 4, 5]
-        rating_sums = {rat: 0 for rat in ratings}
-        for project in self.solution.projects:
-            for student in self.solution.projects[project]:
-                rating_sums[student.projects_ratings[project]] += 1
+        import numpy as np
 
-        x = np.array(ratings)
-        y = np.array(list(rating_sums.values()))
+        x = np.array([1, 2, 3, 4, 5])
+        y = self.metrics.rating_histogram
 
         return x,y
 
     def log_avg_rating(self):
         # log the average rating of students in the solution
-        num_students = len(self.instance.students)
-        avg_rating_per_student = (
-            sum(
-                stu.projects_ratings[proj]
-                for proj in self.solution.projects
-                for stu in self.solution.projects[proj]
-            )
-            / num_students
-        )
-
-        return avg_rating_per_student
+        return self.metrics.avg_rating
         # logger.info('The average rating of students in solution is: %f', avg_rating_per_student)
 
     def log_avg_proj_rating(self):
-        # for each project log the average rating per student
-        ratings = []
-        for proj in self.solution.projects:
-            # if project is empty, continue
-            if len(self.solution.projects[proj]) == 0:
-                continue
-            avg_rating = sum(
-                stu.projects_ratings[proj] for stu in self.solution.projects[proj]
-            ) / len(self.solution.projects[proj])
-            ratings.append(avg_rating)
-            # logger.info('The average student rating of project %s is: %f', self.instance.projects[proj].name, avg_rating)
-        # x axis are the projects
-        projs = list(self.solution.projects)
-        x = np.array(projs)
-        y = np.array(ratings)
+        # for each project log the average rating per student, empty projects are skipped
+        metrics = self.metrics
+        order = metrics.solution_order
+        order = order[metrics.sizes[order] > 0]
+        x = metrics.project_ids[order]
+        y = metrics.avg_project_rating[order]
         return x,y
 
     def log_median_group_size(self):
         # log the median group size
-        group_sizes = [
-            len(self.solution.projects[proj]) for proj in self.solution.projects
-        ]
-        group_sizes.sort()
-        return group_sizes[round(len(group_sizes) / 2)]
+        return self.metrics.median_group_size
         # logger.info('The median group size in the solution is: %i', group_sizes[round(len(group_sizes) / 2)])
 
     def log_proj_util(self):
         # log the utilization of every individual project
-        utils = []
-        project_names = []
-
-        for project in self.solution.projects:
-            # logger.info('The utilization of project %s is: %f', self.instance.projects[proj].name, len(self.solution.projects[proj]) / self.instance.projects[proj].capacity)
-            print(
-                f"The utilization of project {self.instance.projects[project].name} is: {len(self.solution.projects[project]) / self.instance.projects[project].capacity}"
-            )
-            utils.append(
-                len(self.solution.projects[project])
-                / self.instance.projects[project].capacity
-            )
-            project_names.append(self.instance.projects[project].name)
-        # create plot
-        x = np.array(project_names)
-        y = np.array(utils)
+        metrics = self.metrics
+        order = metrics.solution_order
+        x = metrics.project_names[order]
+        y = metrics.utilization[order]
+        for project_name, util in zip(x, y):
+            print(f"The utilization of project {project_name} is: {util}")
         return x,y
 
 
     def log_avg_util(self):
         # compute average utilazation of project capacities
-        avg_utilization = sum(
-            len(self.solution.projects[proj]) / self.instance.projects[proj].capacity
-            for proj in self.solution.projects
-        ) / len(self.solution.projects)
+        avg_utilization = self.metrics.avg_utilization
         # logger.info('The average utilization of project capacities is: %f', avg_utilization)
         print(f"The average utilization of project capacities is: {avg_utilization}")
 
     def log_friend_graph(self):
+        import matplotlib.pyplot as plt
+        import networkx as nx
+        from friend_graph import student_layout
+
         graph = nx.Graph()
-        num_greens = 0
-        num_reds = 0
-        # for each student in solution add friends as edges in graph
-        for proj in self.solution.projects:
-            for student in self.solution.projects[proj]:
-                for friend in student.friends:
-                    # check if this friend is in the same project: if yes make edge green, if not red
-                    nums = [stu.matr_number for stu in self.solution.projects[proj]]
-                    if friend in nums:
-                        graph.add_edge(student.matr_number, friend, color="green")
-                        num_greens += 1
-                    else:
-                        graph.add_edge(student.matr_number, friend, color="red")
-                        num_reds += 1
-
-        layout = nx.kamada_kawai_layout(graph)
+        metrics = self.metrics
+        num_greens = metrics.friends_satisfied
+        num_reds = metrics.friends_unsatisfied
+        # for each student in solution add friends as edges in graph, green if they are in the same project
+        for (student, friend), satisfied in zip(
+            metrics.friend_edges.tolist(), metrics.friend_satisfied.tolist()
+        ):
+            graph.add_edge(student, friend, color="green" if satisfied else "red")
+
+        # students are placed around their project, the layout is cached on disk
+        layout = student_layout(self.instance, metrics, instance_digest=self.instance_hash)
         colors = [graph.edges[e]["color"] for e in graph.edges]
         nx.draw_networkx(
-            graph, pos=layout, edge_color=colors, node_size=15, with_labels=False
+            graph, pos=layout, edge_color=colors, node_size=5, width=0.5, with_labels=False
         )
         plt.title(f"Friend graph. G:{num_greens} R:{num_reds}")
         plt.show()
         return plt.gcf()
 
+    def log_project_friend_graph(self):
+        # aggregated friend graph: one node per project, green nodes keep friendships, red edges break them
+        import matplotlib.pyplot as plt
+        import networkx as nx
+        from friend_graph import project_friend_graph, project_layout
+
+        metrics = self.metrics
+        graph = project_friend_graph(metrics)
+        layout = project_layout(graph)
+        sizes = [30 + 10 * graph.nodes[n]["size"] for n in graph.nodes]
+        kept = [graph.nodes[n]["kept"] for n in graph.nodes]
+        broken = [graph.edges[e]["broken"] for e in graph.edges]
+        max_broken = max(broken, default=1)
+        nx.draw_networkx_nodes(graph, pos=layout, node_size=sizes, node_color=kept, cmap=plt.cm.Greens)
+        nx.draw_networkx_edges(
+            graph,
+            pos=layout,
+            width=[0.5 + 4 * count / max_broken for count in broken],
+            edge_color="red",
+            alpha=0.6,
+        )
+        nx.draw_networkx_labels(graph, pos=layout, font_size=8)
+        plt.title(
+            f"Project friend graph. G:{metrics.friends_satisfied} R:{metrics.friends_unsatisfied}"
+        )
+        plt.show()
+        return plt.gcf()
+
     def log_programming_requirements(self):
         # in solution: For each project log for each programming language % of how students that meet requirement
-        project_requirements_fullfilled_precentage = []
-        project_names = []
-        for project_id in self.solution.projects:
-            project = self.instance.projects[project_id]
-            project_requirements_count = 0.0
-            fullfilled_programming_requirements = 0.0
-            for programming_language in project.programming_requirements:
-                project_requirements_count += project.programming_requirements[programming_language]
-            if project_requirements_count == 0:
-                project_requirements_fullfilled_precentage.append(1)
-                project_names.append(project.name)
-                continue
-
-            for student in self.solution.projects[project_id]:
-                fullfilled_programming_requirements += (self.solution.roles[student.matr_number]/4)
-
-            project_requirements_fullfilled_precentage.append(fullfilled_programming_requirements/project_requirements_count)
-            project_names.append(project.name)
-
-            # create plot
-        x = np.array(project_names)
-        y = np.array(project_requirements_fullfilled_precentage)
+        metrics = self.metrics
+        order = metrics.solution_order
+        x = metrics.project_names[order]
+        y = metrics.requirement_coverage[order]
         return x,y
     
     def log_opt_sizes(self):
         #for each project in solution: plot size in solution and opt_size
         # create plot
-        projs = list(self.solution.projects)
+        import matplotlib.pyplot as plt
+        import numpy as np
+
+        metrics = self.metrics
+        projs = metrics.project_ids
         x = np.arange(len(projs))
-        y = np.array([int((self.instance.projects[proj].capacity + self.instance.projects[proj].min_capacity)/2)
-                       for proj in self.instance.projects])
+        y = metrics.opt_size
         bar1 = plt.bar(x - 0.2, y, width=0.2, color="r", label='Optimal Sizes')
         plt.bar_label(bar1, labels=y, label_type="edge")
 
-        y = np.array([len(self.solution.projects[proj]) for proj in self.instance.projects])
+        y = metrics.sizes
         bar2 = plt.bar(x, y, width=0.2, color="b", label='actual sizes')
         plt.bar_label(bar2, labels=y, label_type="edge")
 
-        y = np.array([self.instance.projects[proj].capacity for proj in self.instance.projects])
+        y = metrics.arrays.capacity
         bar3 = plt.bar(x + 0.2, y, width=0.2, color="g", label='capacity')
         plt.bar_label(bar3, labels=y, label_type="edge")
         
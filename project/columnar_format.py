@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+from typing import Dict
+
+import numpy as np
+from data_schema import Instance
+from instance_arrays import InstanceArrays
+from instance_loader import construct_instance, load_instance
+
+# A columnar on-disk format of an instance: a directory with one .npy file per column and a meta.json with the
+# languages and the string table. Students and projects are addressed by their position, so a student is stored
+# once, also when several projects veto them, and no field name is repeated per student. The .npy files
+# are opened memory-mapped, only the pages that are actually read are loaded.
+#
+#   matr_numbers  int64  S       project_ids    int64  P
+#   ratings       uint8  S x P   (0 = not rated)
+#   skills        uint8  S x L   (0 = language not rated)
+#   requirements  int16  P x L   (-1 = language not listed)
+#   capacity      int32  P       min_capacity   int32  P
+#   friend_pairs  int32  F x 2   (student index, friend index)
+#   veto_pairs    int32  V x 2   (student index, project index)
+#
+# usage: python columnar_format.py to-columnar instances/data_s1000_g100.json instances/data_s1000_g100
+#        python columnar_format.py to-json instances/data_s1000_g100 data_s1000_g100.json
+
+FORMAT_VERSION = 1
+
+COLUMNS = {
+    "matr_numbers": np.int64,
+    "project_ids": np.int64,
+    "ratings": np.uint8,
+    "skills": np.uint8,
+    "requirements": np.int16,
+    "capacity": np.int32,
+    "min_capacity": np.int32,
+    "friend_pairs": np.int32,
+    "veto_pairs": np.int32,
+}
+
+
+def write_columnar(instance: Instance, directory: str):
+    """
+    Writes a validated instance in the columnar format.
+    """
+    arrays = InstanceArrays.from_instance(instance)
+    projects = list(instance.projects.values())
+    language_index = {language: lang_idx for lang_idx, language in enumerate(arrays.languages)}
+
+    requirements = np.full((len(projects), len(arrays.languages)), -1)
+    for j, project in enumerate(projects):
+        for programming_language, number in project.programming_requirements.items():
+            requirements[j, language_index[programming_language]] = number
+
+    friend_pairs = [
+        (i, arrays.student_index[friend])
+        for i, student in enumerate(instance.students)
+        for friend in student.friends
+    ]
+
+    columns = {
+        "matr_numbers": arrays.matr_numbers,
+        "project_ids": arrays.project_ids,
+        "ratings": arrays.ratings,
+        "skills": arrays.skills,
+        "requirements": requirements,
+        "capacity": arrays.capacity,
+        "min_capacity": arrays.min_capacity,
+        "friend_pairs": np.array(friend_pairs).reshape(-1, 2),
+        # in the order of the veto lists, so the instance reads back unchanged
+        "veto_pairs": np.array(
+            [
+                (arrays.student_index[student.matr_number], j)
+                for j, project in enumerate(projects)
+                for student in project.veto
+            ]
+        ).reshape(-1, 2),
+    }
+    meta = {
+        "version": FORMAT_VERSION,
+        "languages": arrays.languages,
+        "last_names": [student.last_name for student in instance.students],
+        "first_names": [student.first_name for student in instance.students],
+        "project_names": [project.name for project in projects],
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    for name, dtype in COLUMNS.items():
+        np.save(os.path.join(directory, f"{name}.npy"), columns[name].astype(dtype))
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def open_columnar(directory: str, mmap: bool = True) -> Dict:
+    """
+    Opens the columns of an instance directory, memory-mapped by default, and the meta data.
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version {meta['version']}.")
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in COLUMNS
+    }
+    return {"meta": meta, **columns}
+
+
+def load_instance_arrays(directory: str) -> InstanceArrays:
+    """
+    Builds the array view of an instance directly from the columns, without any pydantic models.
+    """
+    columns = open_columnar(directory)
+    number_students = len(columns["matr_numbers"])
+    number_projects = len(columns["project_ids"])
+
+    # friend_pairs are grouped by student, the position within the group is the friend slot
+    friend_pairs = np.asarray(columns["friend_pairs"], dtype=np.int64)
+    friend_pairs = friend_pairs[friend_pairs[:, 0] != friend_pairs[:, 1]]
+    friend_pairs = friend_pairs[np.argsort(friend_pairs[:, 0], kind="stable")]
+    slots = np.arange(len(friend_pairs)) - np.searchsorted(
+        friend_pairs[:, 0], friend_pairs[:, 0]
+    )
+    friends = np.full((number_students, 2), -1, dtype=np.int64)
+    friends[friend_pairs[:, 0], slots] = friend_pairs[:, 1]
+
+    veto = np.zeros((number_students, number_projects), dtype=bool)
+    veto_pairs = np.asarray(columns["veto_pairs"])
+    veto[veto_pairs[:, 0], veto_pairs[:, 1]] = True
+
+    return InstanceArrays(
+        matr_numbers=columns["matr_numbers"],
+        project_ids=columns["project_ids"],
+        languages=columns["meta"]["languages"],
+        ratings=columns["ratings"],
+        skills=columns["skills"],
+        requirements=np.maximum(columns["requirements"], 0),
+        friends=friends,
+        capacity=columns["capacity"],
+        min_capacity=columns["min_capacity"],
+        veto=veto,
+    )
+
+
+def read_columnar(directory: str) -> Instance:
+    """
+    Converts an instance directory back to an `Instance`. The data was validated before it was written,
+    so the models are built without validation.
+    """
+    columns = open_columnar(directory)
+    meta = columns["meta"]
+    languages = meta["languages"]
+    matr_numbers = columns["matr_numbers"].tolist()
+    project_ids = columns["project_ids"].tolist()
+
+    friends = [[] for _ in matr_numbers]
+    for i, friend in columns["friend_pairs"].tolist():
+        friends[i].append(matr_numbers[friend])
+
+    students = []
+    for i, (ratings, skills) in enumerate(
+        zip(columns["ratings"].tolist(), columns["skills"].tolist())
+    ):
+        students.append(
+            {
+                "last_name": meta["last_names"][i],
+                "first_name": meta["first_names"][i],
+                "matr_number": matr_numbers[i],
+                "projects_ratings": {
+                    project_id: rating
+                    for project_id, rating in zip(project_ids, ratings)
+                    if rating > 0
+                },
+                "programming_language_ratings": {
+                    language: skill for language, skill in zip(languages, skills) if skill > 0
+                },
+                "friends": friends[i],
+            }
+        )
+
+    vetos = [[] for _ in project_ids]
+    for i, j in columns["veto_pairs"].tolist():
+        vetos[j].append(students[i])
+
+    projects = {}
+    for j, (project_id, requirements) in enumerate(
+        zip(project_ids, columns["requirements"].tolist())
+    ):
+        projects[project_id] = {
+            "id": project_id,
+            "name": meta["project_names"][j],
+            "capacity": int(columns["capacity"][j]),
+            "min_capacity": int(columns["min_capacity"][j]),
+            "veto": vetos[j],
+            "programming_requirements": {
+                language: number
+                for language, number in zip(languages, requirements)
+                if number >= 0
+            },
+        }
+    return construct_instance({"students": students, "projects": projects})
+
+
+def json_to_columnar(filepath: str, directory: str):
+    write_columnar(load_instance(filepath), directory)
+
+
+def columnar_to_json(directory: str, filepath: str):
+    with open(filepath, "w") as f:
+        f.write(read_columnar(directory).model_dump_json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert instances between JSON and the columnar format.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_columnar = subparsers.add_parser("to-columnar")
+    to_columnar.add_argument("filepath")
+    to_columnar.add_argument("directory")
+    to_json = subparsers.add_parser("to-json")
+    to_json.add_argument("directory")
+    to_json.add_argument("filepath")
+    args = parser.parse_args()
+
+    if args.command == "to-columnar":
+        json_to_columnar(args.filepath, args.directory)
+        print(f"Instance written to {args.directory}")
+    else:
+        columnar_to_json(args.directory, args.filepath)
+        print(f"Instance written to {args.filepath}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,167 @@
+import hashlib
 import json
 import os
 
+# combine_data() keeps a manifest with the modification time, size and hash of every student and project file
+# it has read. On the next call only new or changed files are parsed and patched into the combined instance,
+# removed files are dropped from it. The vetoes are resolved through an index of the matriculation numbers.
+# The combined instance stays in memory between calls of the same process, as long as the output file has the
+# modification time and size it was written with, so only the first call parses the output. The output is one
+# JSON document for the solver, so writing it after a change still costs O(all registrations); a call without
+# changes writes nothing.
 
-def combine_data():
-    directory = 'instances/students'
+OUTPUT_FILE = 'instances/SEP_data.json'
+MANIFEST_FILE = 'instances/.combine_manifest.json'
+VETO_FILE = 'instances/veto.json'
 
-    students = []
+# "state": (modification time, size) of the output and the manifest, students and projects it was written from
+_memory = {}
 
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            filepath = os.path.join(directory, filename)
-            with open(filepath, 'r') as file:
-                student_data = json.load(file)
-                students.append(student_data)
 
-    combined_data = {"students": students}
+def _scan(directory):
+    # modification times and sizes come from the directory listing, no file is opened
+    if not os.path.isdir(directory):
+        return {}
+    files = {}
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json'):
+            stat = entry.stat()
+            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
 
-    directory = 'instances/projects'
 
-    projects = {}
+def _output_stat():
+    stat = os.stat(OUTPUT_FILE)
+    return stat.st_mtime_ns, stat.st_size
 
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            filepath = os.path.join(directory, filename)
-            with open(filepath) as file:
-                project_data = json.load(file)
-                project_id = project_data["id"]
-                projects[project_id] = project_data
 
-    veto_file = "instances/veto.json"
-    if os.path.exists(veto_file):
-            with open(veto_file, 'r') as file:
-                veto_data = json.load(file)
-                for project in veto_data:
-                    matr_number = veto_data[project]
-                    student_list = []
-                    for student in combined_data["students"]:
-                        if int(matr_number) == student["matr_number"]:
-                            student_list.append(student)
-                            projects[int(project)]["veto"] = student_list
+def _load_combined(full):
+    """
+    Returns the manifest and the students and projects of the last combined instance,
+    or an empty state if there is none or the output was written by someone else.
+    """
+    # the state is modified in place, it is cached again only after it was written successfully
+    cached = _memory.pop("state", None)
+    empty = {"files": {}, "veto_mtime": None, "output_mtime": None}, {}, {}
+    if full or not os.path.exists(MANIFEST_FILE) or not os.path.exists(OUTPUT_FILE):
+        return empty
+    if cached is not None and cached[0] == _output_stat():
+        return cached[1:]
+    with open(MANIFEST_FILE) as file:
+        manifest = json.load(file)
+    if os.stat(OUTPUT_FILE).st_mtime_ns != manifest["output_mtime"]:
+        return empty
+    with open(OUTPUT_FILE) as file:
+        combined = json.load(file)
+    students = {student["matr_number"]: student for student in combined["students"]}
+    projects = {int(project_id): project for project_id, project in combined["projects"].items()}
+    return manifest, students, projects
 
-    combined_data.update({"projects": projects})
 
+def _write_json(path, data, **kwargs):
+    # write to a temporary file first, so a crash never leaves a half written file behind
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as file:
+        json.dump(data, file, **kwargs)
+    os.replace(tmp_file, path)
 
-    with open('instances/SEP_data.json', 'w') as outfile:
-        json.dump(combined_data, outfile, indent=4)
+
+def _update(manifest, directory, records, key):
+    """
+    Patches the records of the directory with its new, changed and removed files. Returns whether anything changed.
+    Several files may have the same key, the record is taken from the one with the greatest path and is only
+    dropped when no file with that key is left.
+    """
+    changed = False
+    current = _scan(directory)
+    prefix = os.path.join(directory, '')
+
+    # keys whose file was removed or changed, and the files read in this call
+    touched = set()
+    read = {}
+    for path in [path for path in manifest["files"] if path.startswith(prefix)]:
+        if path not in current:
+            touched.add(manifest["files"].pop(path)["key"])
+            changed = True
+
+    for path, (mtime, size) in current.items():
+        entry = manifest["files"].get(path)
+        if entry is not None and entry["mtime"] == mtime and entry["size"] == size:
+            continue
+        with open(path, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry["hash"] == digest:
+            # touched but not changed
+            entry["mtime"], entry["size"] = mtime, size
+            continue
+        data = json.loads(content)
+        if entry is not None:
+            touched.add(entry["key"])
+        touched.add(data[key])
+        read[path] = data
+        manifest["files"][path] = {
+            "mtime": mtime,
+            "size": size,
+            "hash": digest,
+            "key": data[key],
+            # the vetoes of the project file, before veto.json is applied
+            "veto": data.get("veto", []),
+        }
+        changed = True
+
+    owners = {}
+    for path, entry in manifest["files"].items():
+        if path.startswith(prefix):
+            owners.setdefault(entry["key"], []).append(path)
+    for touched_key in touched:
+        if touched_key not in owners:
+            records.pop(touched_key, None)
+            continue
+        owner = max(owners[touched_key])
+        if owner in read:
+            records[touched_key] = read[owner]
+        else:
+            # the owning file did not change, but the record was replaced by a file with the same key that is gone now
+            with open(owner, 'rb') as file:
+                records[touched_key] = json.loads(file.read())
+    return changed
+
+
+def combine_data(full=False):
+    manifest, students, projects = _load_combined(full)
+
+    changed = manifest["output_mtime"] is None
+    changed |= _update(manifest, 'instances/students', students, "matr_number")
+    changed |= _update(manifest, 'instances/projects', projects, "id")
+
+    veto_mtime = os.stat(VETO_FILE).st_mtime_ns if os.path.exists(VETO_FILE) else None
+    changed |= veto_mtime != manifest["veto_mtime"]
+    if not changed:
+        _memory["state"] = (_output_stat(), manifest, students, projects)
+        return
+
+    # reset the vetoes to the ones of the project files, then apply veto.json through the index
+    # sorted by path, so the vetoes of a duplicate id are the ones of the file its record is taken from
+    project_vetos = {
+        entry["key"]: entry["veto"]
+        for path, entry in sorted(manifest["files"].items())
+        if path.startswith(os.path.join('instances/projects', ''))
+    }
+    for project_id, project in projects.items():
+        project["veto"] = project_vetos.get(project_id, [])
+    if veto_mtime is not None:
+        with open(VETO_FILE, 'r') as file:
+            veto_data = json.load(file)
+        for project, matr_number in veto_data.items():
+            student = students.get(int(matr_number))
+            if student is not None and int(project) in projects:
+                projects[int(project)]["veto"] = [student]
+
+    combined_data = {"students": list(students.values()), "projects": projects}
+    _write_json(OUTPUT_FILE, combined_data, indent=4)
+
+    manifest["veto_mtime"] = veto_mtime
+    manifest["output_mtime"] = os.stat(OUTPUT_FILE).st_mtime_ns
+    _write_json(MANIFEST_FILE, manifest)
+    _memory["state"] = (_output_stat(), manifest, students, projects)
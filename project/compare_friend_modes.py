@@ -0,0 +1,46 @@
+import sys
+import time
+
+from data_schema import Instance
+from solver import SepSolver
+
+# compares the eager friend relations with the lazy callback version regarding model size and friends stage time
+
+
+def measure(filepath: str, lazy_friends: bool):
+    with open(filepath) as f:
+        instance: Instance = Instance.model_validate_json(f.read())
+
+    start = time.time()
+    solver = SepSolver(instance, lazy_friends=lazy_friends)
+    solver._model.update()
+    build_time = time.time() - start
+    num_vars = solver._model.NumVars
+    num_constrs = solver._model.NumConstrs
+
+    solver.solve()
+    friends = solver.stage_stats.get("friends", {})
+    return {
+        "build_time": build_time,
+        "num_vars": num_vars,
+        "num_constrs": num_constrs,
+        "friends_time": friends.get("runtime"),
+        "friends_objective": friends.get("objective"),
+    }
+
+
+def main(filepaths):
+    print(
+        f"{'instance':45} {'mode':6} {'vars':>8} {'constrs':>8} {'build[s]':>9} {'friends[s]':>11} {'friends obj':>12}"
+    )
+    for filepath in filepaths:
+        for lazy_friends in (False, True):
+            result = measure(filepath, lazy_friends)
+            print(
+                f"{filepath:45} {'lazy' if lazy_friends else 'eager':6} {result['num_vars']:>8} {result['num_constrs']:>8} "
+                f"{result['build_time']:>9.2f} {result['friends_time'] or 0:>11.2f} {result['friends_objective'] or 0:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["./instances/data_s300_g30.json", "./instances/data_s1000_g50.json"])
@@ -1,6 +1,12 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    field_validator,
+    model_validator,
+)
 
 
 class Student(BaseModel):
@@ -91,7 +97,7 @@ class Instance(BaseModel):
     @classmethod
     def check_friends(cls, v: List[Student]) -> List[Student]:
         friend_groups = [student.friends for student in v]
-        student_matr_numbers = [student.matr_number for student in v]
+        student_matr_numbers = {student.matr_number for student in v}
         for friends in friend_groups:
             for friend in friends:
                 if friend not in student_matr_numbers:
@@ -124,9 +130,10 @@ class Instance(BaseModel):
 
     @model_validator(mode="after")
     def check_vetos(self):
+        student_matr_numbers = {student.matr_number for student in self.students}
         for project in self.projects.values():
             for prohibited_student in project.veto:
-                if prohibited_student not in self.students:
+                if prohibited_student.matr_number not in student_matr_numbers:
                     raise ValueError(
                         f"Student with matriculation number {prohibited_student.matr_number} does not exist."
                     )
@@ -137,8 +144,85 @@ class Solution(BaseModel):
     projects: Dict[int, List[Student]]
     roles:    Dict[int, int]
 
+    # matr_number -> project id, built once from the projects, so a solution should not be changed afterwards
+    _project_of: Dict[int, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        self._project_of = {
+            member.matr_number: proj
+            for proj, members in self.projects.items()
+            for member in members
+        }
+
+    def __eq__(self, other) -> bool:
+        # the index is derived from the fields and does not take part in the comparison
+        if not isinstance(other, Solution):
+            return NotImplemented
+        return self.projects == other.projects and self.roles == other.roles
+
     def get_proj_for_student(self, student: Student):
-        for proj in self.projects:
-            if student in self.projects[proj]:
-                return proj
-        return None
+        return self._project_of.get(student.matr_number)
+
+
+class CompactSolution(BaseModel):
+    """
+    A solution that only stores the project and the role of every student, in three parallel lists.
+    """
+
+    matr_numbers: List[int]
+    projects: List[int]
+    roles: List[int]
+
+    # matr_number -> position in the lists, built once from the lists
+    _index: Dict[int, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        self._index = {
+            matr_number: i for i, matr_number in enumerate(self.matr_numbers)
+        }
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if not len(self.matr_numbers) == len(self.projects) == len(self.roles):
+            raise ValueError("The lists of a compact solution must have the same length.")
+        return self
+
+    def __eq__(self, other) -> bool:
+        # the index is derived from the fields and does not take part in the comparison
+        if not isinstance(other, CompactSolution):
+            return NotImplemented
+        return (
+            self.matr_numbers == other.matr_numbers
+            and self.projects == other.projects
+            and self.roles == other.roles
+        )
+
+    def project_of(self, matr_number: int) -> Optional[int]:
+        i = self._index.get(matr_number)
+        return None if i is None else self.projects[i]
+
+    def role_of(self, matr_number: int) -> Optional[int]:
+        i = self._index.get(matr_number)
+        return None if i is None else self.roles[i]
+
+    @classmethod
+    def from_solution(cls, solution: Solution) -> "CompactSolution":
+        matr_numbers, projects, roles = [], [], []
+        for project_id, students in solution.projects.items():
+            for student in students:
+                matr_numbers.append(student.matr_number)
+                projects.append(project_id)
+                roles.append(solution.roles.get(student.matr_number, 0))
+        return cls(matr_numbers=matr_numbers, projects=projects, roles=roles)
+
+    def to_solution(self, instance: Instance) -> Solution:
+        """
+        Converts back to the full schema, the students are taken from the instance.
+        """
+        students = {student.matr_number: student for student in instance.students}
+        projects = {project_id: [] for project_id in instance.projects}
+        for matr_number, project_id in zip(self.matr_numbers, self.projects):
+            projects[project_id].append(students[matr_number])
+        roles = {student.matr_number: 0 for student in instance.students}
+        roles.update(zip(self.matr_numbers, self.roles))
+        return Solution(projects=projects, roles=roles)
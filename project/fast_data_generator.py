@@ -0,0 +1,188 @@
+import argparse
+import json
+import math
+
+import numpy as np
+from rating_probabilities import calculate_rating_probabilities
+
+# A vectorized variant of test_data_generator.Generator for very large instances (10k - 100k students).
+# It follows the same distributions, including the 10 friend groups of 2 or 3 students (`--friend-groups` for
+# more), but looks the rating probabilities up in a table precomputed from
+# rating_probabilities.py, samples all ratings, skills, friend groups and vetos in batches with NumPy and writes the
+# instance JSON directly to disk without building pydantic models.
+#
+# usage: python fast_data_generator.py --students 100000 --projects 1000 --out instances/data_s100000_g1000.json
+
+LANGUAGES = ["Python", "Java", "C/C++", "SQL", "PHP"]
+REQUIREMENT_LANGUAGES = ["Python", "Java", "C/C++", "PHP", "SQL"]
+
+# skills of the student types (cracked, basic, python bro, web developer, copied homework) and their probabilities
+STUDENT_TYPES = np.array(
+    [(4, 4, 4, 4, 4), (2, 3, 3, 1, 2), (4, 2, 2, 2, 1), (3, 2, 2, 4, 4), (1, 1, 1, 1, 1)]
+)
+STUDENT_TYPE_DISTRIBUTION = [0.2, 0.2, 0.2, 0.2, 0.2]
+
+# the average ratings are redrawn for every block of students, like in the original generator
+DISTRIBUTION_BLOCK = 60
+
+# disjoint groups of 2 or 3 mutual friends, like in Generator.generateFriendgroups
+FRIEND_GROUPS = 10
+
+# number of students whose ratings are sampled at once, bounds the memory of the S x P x 5 comparison
+CHUNK_SIZE = 1200
+
+# cumulative probabilities for every value of int(average_rating * 100) between 100 and 500
+CUMULATIVE_RATING_TABLE = np.cumsum(
+    [calculate_rating_probabilities(value / 100) for value in range(501)], axis=1
+)
+
+
+class FastGenerator:
+    """
+    Generates the arrays of an instance in batches and writes them as instance JSON.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def generate_projects(self, number_projects: int, number_students: int):
+        capacity = self.rng.integers(5, 18, size=number_projects)
+        min_capacity = self.rng.integers(5, capacity + 1)
+        # increase the capacities round-robin until all students fit
+        while capacity.sum() < number_students:
+            additions = self.rng.integers(2, 8, size=number_projects)
+            missing = number_students - capacity.sum()
+            needed = np.searchsorted(np.cumsum(additions), missing) + 1
+            additions[needed:] = 0
+            capacity += additions
+
+        requirements = np.zeros((number_projects, len(REQUIREMENT_LANGUAGES)), dtype=np.int64)
+        max_requirements = capacity.copy()
+        for lang_idx in range(len(REQUIREMENT_LANGUAGES)):
+            requirements[:, lang_idx] = self.rng.integers(0, np.minimum(max_requirements, 4) + 1)
+            max_requirements -= requirements[:, lang_idx]
+        return capacity, min_capacity, requirements
+
+    def generate_ratings(self, start: int, stop: int, number_projects: int):
+        """
+        Samples the project ratings of the students start to stop - 1 by inverse transform sampling.
+        """
+        blocks = np.arange(start, stop) // DISTRIBUTION_BLOCK
+        first_block, last_block = blocks[0], blocks[-1]
+        cumulative = self._block_cumulative[first_block : last_block + 1][blocks - first_block]
+        samples = self.rng.random((stop - start, number_projects, 1))
+        return (samples > cumulative[:, :, :4]).sum(axis=2) + 1
+
+    def generate_friend_groups(self, number_students: int, number_groups: int):
+        """
+        Returns a S x 2 array of friend indices (padded with -1) of disjoint, mutual groups of 2 or 3 students.
+        """
+        friends = np.full((number_students, 2), -1, dtype=np.int64)
+        sizes = self.rng.integers(2, 4, size=number_groups)
+        members = self.rng.permutation(number_students)[: sizes.sum()]
+        ends = np.cumsum(sizes)
+        ends = ends[ends <= len(members)]
+        starts = np.concatenate(([0], ends[:-1]))
+        for start, end in zip(starts, ends):
+            group = members[start:end]
+            for position, student in enumerate(group):
+                others = np.delete(group, position)
+                friends[student, : len(others)] = others
+        return friends
+
+    def generate_vetos(self, number_projects: int, number_students: int):
+        """
+        Returns the vetoed students of every project: 10 % of the projects veto ceil(log10(S)) + 1 students.
+        """
+        number_vetos = min(math.ceil(math.log10(number_students)) + 1, number_students)
+        vetoing = self.rng.random(number_projects) <= 0.1
+        return [
+            self.rng.choice(number_students, size=number_vetos, replace=False)
+            if vetoing[j]
+            else np.array([], dtype=np.int64)
+            for j in range(number_projects)
+        ]
+
+    def write_instance(
+        self,
+        filepath: str,
+        number_projects: int,
+        number_students: int,
+        number_groups: int = FRIEND_GROUPS,
+    ):
+        """
+        Generates an instance and streams it to the file in the format of `Instance.model_dump_json`.
+        """
+        capacity, min_capacity, requirements = self.generate_projects(
+            number_projects, number_students
+        )
+        number_blocks = math.ceil(number_students / DISTRIBUTION_BLOCK)
+        average_ratings = np.clip(
+            3 + self.rng.uniform(-2, 2, size=(number_blocks, number_projects)), 1, 5
+        )
+        self._block_cumulative = CUMULATIVE_RATING_TABLE[(average_ratings * 100).astype(np.int64)]
+        skills = STUDENT_TYPES[
+            self.rng.choice(len(STUDENT_TYPES), size=number_students, p=STUDENT_TYPE_DISTRIBUTION)
+        ]
+        friends = self.generate_friend_groups(number_students, number_groups)
+        vetos = self.generate_vetos(number_projects, number_students)
+        vetoed_students = {int(i) for veto in vetos for i in veto}
+        # the vetoed students are kept until the projects are written, all others are only serialized
+        vetoed_data = {}
+
+        def student_data(i, ratings):
+            return {
+                "last_name": "Doe",
+                "first_name": "Joe",
+                "matr_number": i,
+                "projects_ratings": dict(zip(map(str, range(number_projects)), ratings)),
+                "programming_language_ratings": dict(zip(LANGUAGES, skills[i].tolist())),
+                "friends": [int(friend) for friend in friends[i] if friend >= 0],
+            }
+
+        with open(filepath, "w") as f:
+            f.write('{"students":[')
+            for start in range(0, number_students, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, number_students)
+                ratings = self.generate_ratings(start, stop, number_projects).tolist()
+                for i in range(start, stop):
+                    data = student_data(i, ratings[i - start])
+                    if i in vetoed_students:
+                        vetoed_data[i] = data
+                    f.write(("," if i > 0 else "") + json.dumps(data))
+            f.write('],"projects":{')
+            for j in range(number_projects):
+                project = json.dumps(
+                    {
+                        "id": j,
+                        "name": str(j),
+                        "capacity": int(capacity[j]),
+                        "min_capacity": int(min_capacity[j]),
+                        "veto": [vetoed_data[int(i)] for i in vetos[j]],
+                        "programming_requirements": dict(
+                            zip(REQUIREMENT_LANGUAGES, requirements[j].tolist())
+                        ),
+                    }
+                )
+                f.write(("," if j > 0 else "") + f'"{j}":{project}')
+            f.write("}}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large SEP instances with NumPy.")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--friend-groups", type=int, default=FRIEND_GROUPS, help="number of friend groups")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--out", help="default: instances/data_s<students>_g<projects>.json")
+    args = parser.parse_args()
+
+    filepath = args.out or f"instances/data_s{args.students}_g{args.projects}.json"
+    FastGenerator(args.seed).write_instance(
+        filepath, args.projects, args.students, number_groups=args.friend_groups
+    )
+    print(f"Instance written to {filepath}")
+
+
+if __name__ == "__main__":
+    main()
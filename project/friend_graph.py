@@ -0,0 +1,120 @@
+import hashlib
+import os
+from typing import Optional
+
+import networkx as nx
+import numpy as np
+from data_schema import Instance
+from metrics import Metrics
+
+# Layouts for the friend graph that scale to large cohorts. The project graph contracts every student to their
+# assigned project, so the force directed layout only has to place the projects. The students are then put on a
+# circle around their project, with friends next to each other. The student layout is cached on disk, keyed by
+# the hashes of the instance and the assignment. Only the MAX_CACHE_FILES most recently used layouts are kept.
+
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".layout_cache")
+MAX_CACHE_FILES = 64
+
+
+def instance_hash(instance: Instance) -> str:
+    return hashlib.sha256(instance.model_dump_json().encode()).hexdigest()
+
+
+def project_friend_graph(metrics: Metrics) -> nx.Graph:
+    """
+    Returns a graph with one node per project. The node attribute `kept` counts the friendships inside the
+    project, the edge attribute `broken` the friendships between two projects. Unassigned students are left out.
+    """
+    a = metrics.arrays
+    students, slots = np.nonzero(a.friends >= 0)
+    source = metrics.assignment[students]
+    target = metrics.assignment[a.friends[students, slots]]
+    assigned = (source >= 0) & (target >= 0)
+    source, target = source[assigned], target[assigned]
+
+    kept = np.bincount(source[source == target], minlength=a.number_projects)
+    # count every broken friendship once per direction on the unordered project pair
+    broken_pairs = np.sort(np.stack([source, target], axis=1)[source != target], axis=1)
+    pairs, counts = np.unique(broken_pairs, axis=0, return_counts=True)
+
+    graph = nx.Graph()
+    for j, project_id in enumerate(a.project_ids.tolist()):
+        graph.add_node(project_id, size=int(metrics.sizes[j]), kept=int(kept[j]))
+    for (j, k), count in zip(pairs.tolist(), counts.tolist()):
+        graph.add_edge(int(a.project_ids[j]), int(a.project_ids[k]), broken=count)
+    return graph
+
+
+def project_layout(graph: nx.Graph):
+    # few nodes, so the spring layout is fast, strongly connected projects are drawn close together
+    return nx.spring_layout(graph, weight="broken", seed=0)
+
+
+def _compute_student_layout(metrics: Metrics, positions) -> np.ndarray:
+    a = metrics.arrays
+    layout = np.zeros((a.number_students, 2))
+    # friends get the same key, so they are neighbours on the circle of their project
+    keys = np.arange(a.number_students)
+    for slot in range(a.friends.shape[1]):
+        friends = a.friends[:, slot]
+        keys = np.where(friends >= 0, np.minimum(keys, friends), keys)
+
+    # students grouped by project and friends, unassigned students (-1) come first
+    order = np.lexsort((keys, metrics.assignment))
+    bounds = np.searchsorted(
+        metrics.assignment[order], np.arange(a.number_projects + 1)
+    )
+
+    spread = 0.05 * max(1.0, np.sqrt(a.number_projects) / 2)
+    centers = np.array([positions[int(project_id)] for project_id in a.project_ids])
+    for j in range(a.number_projects):
+        members = order[bounds[j] : bounds[j + 1]]
+        if len(members) == 0:
+            continue
+        angles = 2 * np.pi * np.arange(len(members)) / len(members)
+        radius = spread * np.sqrt(len(members) / 10)
+        layout[members] = centers[j] + radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+    # unassigned students on an outer ring
+    unassigned = order[: bounds[0]]
+    if len(unassigned):
+        angles = 2 * np.pi * np.arange(len(unassigned)) / len(unassigned)
+        layout[unassigned] = 1.3 * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    return layout
+
+
+def _prune_cache():
+    # the modification time is the time of the last use, the least recently used layouts are removed
+    entries = sorted(
+        (entry for entry in os.scandir(LAYOUT_CACHE_DIR) if entry.name.endswith(".npy")),
+        key=lambda entry: entry.stat().st_mtime_ns,
+    )
+    for entry in entries[: max(len(entries) - MAX_CACHE_FILES, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def student_layout(
+    instance: Instance, metrics: Metrics, positions=None, instance_digest: Optional[str] = None
+):
+    """
+    Returns the position of every student as dict matr_number -> (x, y), loaded from the cache if possible.
+    The hash of the instance can be passed as `instance_digest` if the caller already computed it.
+    """
+    if instance_digest is None:
+        instance_digest = instance_hash(instance)
+    key = hashlib.sha256(instance_digest.encode() + metrics.assignment.tobytes()).hexdigest()
+    cache_file = os.path.join(LAYOUT_CACHE_DIR, f"{key}.npy")
+    if os.path.exists(cache_file):
+        layout = np.load(cache_file)
+        os.utime(cache_file)
+    else:
+        if positions is None:
+            positions = project_layout(project_friend_graph(metrics))
+        layout = _compute_student_layout(metrics, positions)
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        np.save(cache_file, layout)
+        _prune_cache()
+    return dict(zip(metrics.arrays.matr_numbers.tolist(), layout))
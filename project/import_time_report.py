@@ -0,0 +1,84 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+# Measures the import time of the entry points with `python -X importtime`. Only the module level imports of
+# an entry point are executed, not the page itself, so Streamlit pages can be measured without a server.
+#
+# usage: python import_time_report.py
+#        python import_time_report.py web.py --top 20
+
+ENTRY_POINTS = [
+    "web.py",
+    "sep_configurator.py",
+    "pages/Projekte_konfigurieren.py",
+    "verify.py",
+    "solve_service.py",
+]
+
+
+def module_level_imports(filepath: str) -> str:
+    """
+    Returns the import statements at the top level of the file as source code.
+    """
+    with open(filepath) as f:
+        tree = ast.parse(f.read())
+    imports = [
+        node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    return "\n".join(ast.unparse(node) for node in imports)
+
+
+def measure(filepath: str):
+    """
+    Returns the total import time in microseconds and the (cumulative time, module) pairs of the top level imports.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    code = f"import sys; sys.path.insert(0, {directory!r})\n" + module_level_imports(filepath)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=directory,
+        capture_output=True,
+        text=True,
+        # a failed import is reported with its traceback instead of raising CalledProcessError
+        check=False,
+    )
+    if result.returncode != 0:
+        # only the traceback, without the import times that were measured until the failure
+        error = "\n".join(
+            line for line in result.stderr.splitlines() if not line.startswith("import time:")
+        )
+        raise RuntimeError(f"Importing the modules of {filepath} failed (exit code {result.returncode}):\n{error}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented, the top level ones are not
+        if not name[1:].startswith(" "):
+            modules.append((int(cumulative), name.strip()))
+    return sum(cumulative for cumulative, _ in modules), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the import time of the entry points.")
+    parser.add_argument("entry_points", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--top", type=int, default=10, help="number of the slowest imports to show")
+    args = parser.parse_args()
+
+    for filepath in args.entry_points:
+        try:
+            total, modules = measure(filepath)
+        except RuntimeError as e:
+            print(e)
+            continue
+        print(f"{filepath}: {total / 1000:.1f} ms")
+        for cumulative, name in sorted(modules, reverse=True)[: args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
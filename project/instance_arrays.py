@@ -0,0 +1,126 @@
+from typing import List, Sequence
+
+import numpy as np
+from data_schema import Instance
+
+
+class InstanceArrays:
+    """
+    An index-based NumPy view of an instance. Students and projects are addressed by their position in
+    `matr_numbers` and `project_ids`, so that algorithms working on this view never touch pydantic models.
+    """
+
+    def __init__(
+        self,
+        matr_numbers: np.ndarray,
+        project_ids: np.ndarray,
+        languages: Sequence[str],
+        ratings: np.ndarray,
+        skills: np.ndarray,
+        requirements: np.ndarray,
+        friends: np.ndarray,
+        capacity: np.ndarray,
+        min_capacity: np.ndarray,
+        veto: np.ndarray,
+    ) -> None:
+        # matr_numbers: S, project_ids: P, ratings: S x P, skills: S x L (0 = language unknown),
+        # requirements: P x L, friends: S x 2 friend indices padded with -1, veto: S x P booleans.
+        # ratings and skills keep the dtype they are given in, so memory-mapped uint8 columns are not copied.
+        # They have to be cast to a signed type before they are subtracted.
+        self.matr_numbers = np.asarray(matr_numbers, dtype=np.int64)
+        self.project_ids = np.asarray(project_ids, dtype=np.int64)
+        self.languages = list(languages)
+        self.ratings = np.asarray(ratings)
+        self.skills = np.asarray(skills)
+        self.requirements = np.asarray(requirements, dtype=np.int64)
+        self.friends = np.asarray(friends, dtype=np.int64)
+        self.capacity = np.asarray(capacity, dtype=np.int64)
+        self.min_capacity = np.asarray(min_capacity, dtype=np.int64)
+        self.veto = np.asarray(veto, dtype=bool)
+
+        self.number_students = len(self.matr_numbers)
+        self.number_projects = len(self.project_ids)
+
+        self.student_index = {
+            int(matr_number): i for i, matr_number in enumerate(self.matr_numbers)
+        }
+        self.project_index = {
+            int(project_id): j for j, project_id in enumerate(self.project_ids)
+        }
+
+        # same rounding as the optimal size objective of the solver
+        self.opt_size = (self.capacity + self.min_capacity) // 2
+
+        # the rating objective of the solver only counts students that rate at least 20 % of the projects positively
+        positive_ratings = (self.ratings >= 3).sum(axis=1)
+        self.rating_weight = (
+            positive_ratings >= 0.2 * self.number_projects
+        ).astype(np.int64)
+
+        # students that named a given student as their friend
+        self.followers: List[List[int]] = [[] for _ in range(self.number_students)]
+        for i, friend_indices in enumerate(self.friends):
+            for friend in friend_indices:
+                if friend >= 0:
+                    self.followers[friend].append(i)
+
+    @classmethod
+    def from_instance(cls, instance: Instance) -> "InstanceArrays":
+        """
+        Builds the arrays from a validated instance.
+        """
+        students = instance.students
+        projects = list(instance.projects.values())
+
+        languages = []
+        for project in projects:
+            for programming_language in project.programming_requirements:
+                if programming_language not in languages:
+                    languages.append(programming_language)
+        for student in students:
+            for programming_language in student.programming_language_ratings:
+                if programming_language not in languages:
+                    languages.append(programming_language)
+        language_index = {language: lang_idx for lang_idx, language in enumerate(languages)}
+
+        matr_numbers = np.array([student.matr_number for student in students])
+        project_ids = np.array([project.id for project in projects])
+        student_index = {
+            student.matr_number: i for i, student in enumerate(students)
+        }
+
+        ratings = np.zeros((len(students), len(projects)), dtype=np.int64)
+        skills = np.zeros((len(students), len(languages)), dtype=np.int64)
+        friends = np.full((len(students), 2), -1, dtype=np.int64)
+        for i, student in enumerate(students):
+            for j, project in enumerate(projects):
+                ratings[i, j] = student.projects_ratings.get(project.id, 0)
+            for programming_language, rating in student.programming_language_ratings.items():
+                skills[i, language_index[programming_language]] = rating
+            own_friends = [
+                student_index[friend]
+                for friend in student.friends
+                if friend != student.matr_number
+            ]
+            friends[i, : len(own_friends)] = own_friends
+
+        requirements = np.zeros((len(projects), len(languages)), dtype=np.int64)
+        veto = np.zeros((len(students), len(projects)), dtype=bool)
+        for j, project in enumerate(projects):
+            for programming_language, number in project.programming_requirements.items():
+                requirements[j, language_index[programming_language]] = number or 0
+            for prohibited_student in project.veto:
+                veto[student_index[prohibited_student.matr_number], j] = True
+
+        return cls(
+            matr_numbers=matr_numbers,
+            project_ids=project_ids,
+            languages=languages,
+            ratings=ratings,
+            skills=skills,
+            requirements=requirements,
+            friends=friends,
+            capacity=np.array([project.capacity for project in projects]),
+            min_capacity=np.array([project.min_capacity for project in projects]),
+            veto=veto,
+        )
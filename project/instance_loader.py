@@ -0,0 +1,103 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import data_schema
+from data_schema import Instance, Project, Student
+
+# Full validation of an instance runs the regexes and validators of every student. Files that were validated
+# once are remembered by the SHA-256 of their content, and later loads of the same content build the models
+# with `model_construct`, which skips all validation. Any change of the file changes the hash and the file is
+# validated again. The hash also covers data_schema.py, so a change of the validators invalidates all entries.
+
+CACHE_FILE_NAME = ".validated_instances.json"
+
+_lock = threading.Lock()
+
+
+def _cache_file(filepath: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_FILE_NAME)
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_hash() -> str:
+    with open(data_schema.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_hashes(cache_file: str) -> set:
+    if not os.path.exists(cache_file):
+        return set()
+    with open(cache_file) as f:
+        return set(json.load(f))
+
+
+def _save_hash(cache_file: str, digest: str):
+    with _lock:
+        hashes = _load_hashes(cache_file)
+        hashes.add(digest)
+        # write to a temporary file first, so concurrent loaders never read a half written cache
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(sorted(hashes), f)
+        os.replace(tmp_file, cache_file)
+
+
+def _construct_student(data) -> Student:
+    return Student.model_construct(
+        last_name=data["last_name"],
+        first_name=data["first_name"],
+        matr_number=data["matr_number"],
+        projects_ratings={
+            int(project_id): rating
+            for project_id, rating in data["projects_ratings"].items()
+        },
+        programming_language_ratings=data["programming_language_ratings"],
+        friends=data["friends"],
+    )
+
+
+def construct_instance(data) -> Instance:
+    """
+    Builds an instance from already validated JSON data without any validation.
+    The vetoed students are the same objects as in the student list.
+    """
+    students = [_construct_student(student) for student in data["students"]]
+    students_by_matr_number = {student.matr_number: student for student in students}
+    projects = {}
+    for project_id, project in data["projects"].items():
+        projects[int(project_id)] = Project.model_construct(
+            id=project["id"],
+            name=project["name"],
+            capacity=project["capacity"],
+            min_capacity=project["min_capacity"],
+            veto=[
+                students_by_matr_number.get(student["matr_number"])
+                or _construct_student(student)
+                for student in project["veto"]
+            ],
+            programming_requirements=project["programming_requirements"],
+        )
+    return Instance.model_construct(students=students, projects=projects)
+
+
+def load_instance(filepath: str, trusted: bool = True) -> Instance:
+    """
+    Loads an instance file. The content is fully validated the first time, afterwards it is trusted.
+    With trusted=False the file is always validated.
+    """
+    with open(filepath, "rb") as f:
+        content = f.read()
+    if not trusted:
+        return Instance.model_validate_json(content)
+
+    digest = hashlib.sha256(_schema_hash().encode() + content).hexdigest()
+    cache_file = _cache_file(filepath)
+    if digest in _load_hashes(cache_file):
+        return construct_instance(json.loads(content))
+
+    instance = Instance.model_validate_json(content)
+    _save_hash(cache_file, digest)
+    return instance
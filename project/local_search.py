@@ -0,0 +1,380 @@
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+from data_schema import Instance, Solution
+from instance_arrays import InstanceArrays
+
+
+class LocalSearch:
+    """
+    A move/swap local search on a feasible assignment. Every candidate is evaluated with constant time deltas
+    on the four solver objectives (rating, programming roles, friends, maximum deviation from the optimal size)
+    and only lexicographically improving moves that keep the capacities, minimum capacities and vetos are applied.
+    Single moves can not open an empty project with a minimum capacity above one, so the set of opened projects
+    chosen by the solver is kept.
+    """
+
+    def __init__(
+        self, arrays: InstanceArrays, assignment: np.ndarray, roles: np.ndarray
+    ) -> None:
+        self._arrays = arrays
+        a = arrays
+
+        self.assignment = np.array(assignment, dtype=np.int64)
+        self.roles = np.array(roles, dtype=np.int64)
+        self.counts = np.bincount(self.assignment, minlength=a.number_projects)
+        self.role_counts = np.zeros_like(a.requirements)
+        for i, language in enumerate(self.roles):
+            if language >= 0:
+                self.role_counts[self.assignment[i], language] += 1
+
+        # rating of every student for their current project, signed for the differences in _improve_student
+        self._current_ratings = a.ratings[np.arange(a.number_students), self.assignment].astype(np.int64)
+
+        self.rating = int((a.rating_weight * self._current_ratings).sum())
+        self.programming = sum(
+            self._role_skill(i, self.roles[i]) for i in range(a.number_students)
+        )
+        self.friends = sum(
+            1
+            for i in range(a.number_students)
+            for friend in a.friends[i]
+            if friend >= 0 and self.assignment[friend] == self.assignment[i]
+        )
+
+        # histogram of the deviations from the optimal size to update the maximum deviation in constant time
+        deviations = np.abs(self.counts - a.opt_size)
+        max_deviation = int(max(a.opt_size.max(initial=0), (a.capacity - a.opt_size).max(initial=0)))
+        self._deviation_histogram = np.bincount(
+            deviations, minlength=max_deviation + 2
+        )
+        self.max_deviation = int(deviations.max(initial=0))
+
+    def objective(self) -> Tuple[int, int, int, int]:
+        """
+        Returns the values of the rating, programming, friends and optimal size objective.
+        """
+        return self.rating, self.programming, self.friends, self.max_deviation
+
+    def _key(self, rating, programming, friends, max_deviation):
+        # the solver optimizes the objectives lexicographically, the deviation is minimized
+        return rating, programming, friends, -max_deviation
+
+    def _role_skill(self, student: int, language: int) -> int:
+        if language < 0:
+            return 0
+        return int(self._arrays.skills[student, language])
+
+    def _best_role(self, student: int, project: int, freed_language: int = -1):
+        """
+        Returns the language of the free role with the highest skill of the student in the project or -1.
+        """
+        a = self._arrays
+        best_language = -1
+        best_skill = 0
+        for language in range(len(a.languages)):
+            free = a.requirements[project, language] - self.role_counts[project, language]
+            if language == freed_language:
+                free += 1
+            skill = a.skills[student, language]
+            if free > 0 and skill > best_skill:
+                best_language = language
+                best_skill = skill
+        return best_language, int(best_skill)
+
+    def _friends_delta(self, changed) -> int:
+        """
+        Returns the change of the friends objective if the students in `changed` are moved to the given projects.
+        """
+        a = self._arrays
+
+        def project_of(student):
+            return changed.get(student, self.assignment[student])
+
+        pairs = set()
+        for student in changed:
+            for friend in a.friends[student]:
+                if friend >= 0:
+                    pairs.add((student, int(friend)))
+            for follower in a.followers[student]:
+                pairs.add((follower, student))
+        delta = 0
+        for student, friend in pairs:
+            delta += int(project_of(student) == project_of(friend))
+            delta -= int(self.assignment[student] == self.assignment[friend])
+        return delta
+
+    def _max_deviation_after(self, count_changes) -> int:
+        a = self._arrays
+        histogram = self._deviation_histogram
+        for project, change in count_changes:
+            histogram[abs(self.counts[project] - a.opt_size[project])] -= 1
+            histogram[abs(self.counts[project] + change - a.opt_size[project])] += 1
+        max_deviation = min(self.max_deviation + 1, len(histogram) - 1)
+        while max_deviation > 0 and histogram[max_deviation] == 0:
+            max_deviation -= 1
+        for project, change in count_changes:
+            histogram[abs(self.counts[project] + change - a.opt_size[project])] -= 1
+            histogram[abs(self.counts[project] - a.opt_size[project])] += 1
+        return max_deviation
+
+    def _update_counts(self, count_changes) -> None:
+        a = self._arrays
+        for project, change in count_changes:
+            self._deviation_histogram[abs(self.counts[project] - a.opt_size[project])] -= 1
+            self.counts[project] += change
+            self._deviation_histogram[abs(self.counts[project] - a.opt_size[project])] += 1
+
+    def _set_role(self, student: int, project: int, language: int) -> None:
+        old_language = self.roles[student]
+        if old_language >= 0:
+            self.role_counts[self.assignment[student], old_language] -= 1
+        if language >= 0:
+            self.role_counts[project, language] += 1
+        self.roles[student] = language
+
+    def try_move(self, student: int, project: int) -> bool:
+        """
+        Moves the student to the project if this is feasible and improves the objectives.
+        """
+        a = self._arrays
+        source = self.assignment[student]
+        language, skill = self._best_role(student, project)
+
+        rating = self.rating + int(
+            a.rating_weight[student]
+            * (int(a.ratings[student, project]) - int(a.ratings[student, source]))
+        )
+        programming = self.programming + skill - self._role_skill(student, self.roles[student])
+        friends = self.friends + self._friends_delta({student: project})
+        count_changes = ((source, -1), (project, 1))
+        max_deviation = self._max_deviation_after(count_changes)
+
+        if self._key(rating, programming, friends, max_deviation) <= self._key(
+            *self.objective()
+        ):
+            return False
+
+        self._update_counts(count_changes)
+        self._set_role(student, project, language)
+        self.assignment[student] = project
+        self._current_ratings[student] = a.ratings[student, project]
+        self.rating, self.programming, self.friends, self.max_deviation = (
+            rating,
+            programming,
+            friends,
+            max_deviation,
+        )
+        return True
+
+    def try_swap(self, student: int, other: int) -> bool:
+        """
+        Swaps the projects of both students if this improves the objectives.
+        """
+        a = self._arrays
+        project = self.assignment[student]
+        other_project = self.assignment[other]
+        language, skill = self._best_role(student, other_project, self.roles[other])
+        other_language, other_skill = self._best_role(
+            other, project, self.roles[student]
+        )
+
+        rating = self.rating + int(
+            a.rating_weight[student]
+            * (int(a.ratings[student, other_project]) - int(a.ratings[student, project]))
+            + a.rating_weight[other]
+            * (int(a.ratings[other, project]) - int(a.ratings[other, other_project]))
+        )
+        programming = (
+            self.programming
+            + skill
+            + other_skill
+            - self._role_skill(student, self.roles[student])
+            - self._role_skill(other, self.roles[other])
+        )
+        friends = self.friends + self._friends_delta(
+            {student: other_project, other: project}
+        )
+
+        if self._key(rating, programming, friends, self.max_deviation) <= self._key(
+            *self.objective()
+        ):
+            return False
+
+        self._set_role(student, project, -1)
+        self._set_role(other, other_project, -1)
+        self._set_role(student, other_project, language)
+        self._set_role(other, project, other_language)
+        self.assignment[student] = other_project
+        self.assignment[other] = project
+        self._current_ratings[student] = a.ratings[student, other_project]
+        self._current_ratings[other] = a.ratings[other, project]
+        self.rating, self.programming, self.friends = rating, programming, friends
+        return True
+
+    def fill_roles(self) -> None:
+        """
+        Gives every student without a role the best free role of their project.
+        """
+        for student in range(self._arrays.number_students):
+            if self.roles[student] < 0:
+                project = self.assignment[student]
+                language, skill = self._best_role(student, project)
+                if language >= 0:
+                    self._set_role(student, project, language)
+                    self.programming += skill
+
+    def _improve_student(self, student: int, deadline: float) -> bool:
+        a = self._arrays
+        project = self.assignment[student]
+        # the ratings may be stored unsigned, the differences below need a signed type
+        student_ratings = a.ratings[student].astype(np.int64)
+
+        # moves: the source project has to stay empty or above its minimum capacity, and the target project
+        # has to reach its minimum capacity with this student (an empty project is only opened if that is 1)
+        remaining = self.counts[project] - 1
+        if remaining == 0 or remaining >= a.min_capacity[project]:
+            rating_delta = a.rating_weight[student] * (
+                student_ratings - student_ratings[project]
+            )
+            feasible = (
+                ~a.veto[student]
+                & (self.counts < a.capacity)
+                & (self.counts + 1 >= a.min_capacity)
+                & (rating_delta >= 0)
+            )
+            feasible[project] = False
+            candidates = np.flatnonzero(feasible)
+            for target in candidates[np.argsort(-rating_delta[candidates], kind="stable")]:
+                if time.monotonic() > deadline:
+                    return False
+                if self.try_move(student, int(target)):
+                    return True
+
+        # swaps: the sizes of the projects do not change
+        rating_delta = a.rating_weight[student] * (
+            student_ratings[self.assignment] - student_ratings[project]
+        ) + a.rating_weight * (a.ratings[:, project].astype(np.int64) - self._current_ratings)
+        feasible = (
+            (self.assignment != project)
+            & ~a.veto[student, self.assignment]
+            & ~a.veto[:, project]
+            & (rating_delta >= 0)
+        )
+        candidates = np.flatnonzero(feasible)
+        for other in candidates[np.argsort(-rating_delta[candidates], kind="stable")]:
+            if time.monotonic() > deadline:
+                return False
+            if self.try_swap(student, int(other)):
+                return True
+        return False
+
+    def run(self, time_limit: float = 10.0, max_passes: Optional[int] = None) -> int:
+        """
+        Applies improving moves and swaps until a local optimum or the limits are reached.
+        Returns the number of applied moves.
+        """
+        deadline = time.monotonic() + time_limit
+        self.fill_roles()
+        applied = 0
+        passes = 0
+        improved = True
+        while improved and (max_passes is None or passes < max_passes):
+            improved = False
+            for student in range(self._arrays.number_students):
+                if time.monotonic() > deadline:
+                    return applied
+                while self._improve_student(student, deadline):
+                    applied += 1
+                    improved = True
+            self.fill_roles()
+            passes += 1
+        return applied
+
+
+def _match_roles(arrays: InstanceArrays, project: int, role_skills, roles: np.ndarray):
+    """
+    Gives the students of one project (student -> skill level of their role) a language with that skill and a
+    free position, as a bipartite matching of the students to the required positions. Students without a
+    matching position keep -1.
+    """
+    # one slot per required position and the student that holds it or -1
+    slots = [
+        language
+        for language in range(len(arrays.languages))
+        for _ in range(arrays.requirements[project, language])
+    ]
+    holders = [-1] * len(slots)
+
+    def augment(student, visited):
+        for slot, language in enumerate(slots):
+            if slot in visited or arrays.skills[student, language] != role_skills[student]:
+                continue
+            visited.add(slot)
+            if holders[slot] < 0 or augment(holders[slot], visited):
+                holders[slot] = student
+                return True
+        return False
+
+    for student in role_skills:
+        augment(student, set())
+    for slot, student in enumerate(holders):
+        if student >= 0:
+            roles[student] = slots[slot]
+
+
+def _roles_from_solution(arrays: InstanceArrays, assignment, solution: Solution):
+    # the solution only stores the skill level of the role, so the languages are recovered per project with a
+    # matching, a first fit could take the position another student needs and lose roles
+    roles = np.full(arrays.number_students, -1, dtype=np.int64)
+    role_skills = {}
+    for i, matr_number in enumerate(arrays.matr_numbers):
+        skill = solution.roles.get(int(matr_number), 0)
+        if skill > 0:
+            role_skills.setdefault(int(assignment[i]), {})[i] = skill
+    for project, project_role_skills in role_skills.items():
+        _match_roles(arrays, project, project_role_skills, roles)
+    return roles
+
+
+def search_from_solution(arrays: InstanceArrays, solution: Solution) -> LocalSearch:
+    """
+    Sets up the local search on the assignment and roles of a solution.
+    """
+    assignment = np.full(arrays.number_students, -1, dtype=np.int64)
+    for project_id, students in solution.projects.items():
+        for student in students:
+            assignment[arrays.student_index[student.matr_number]] = arrays.project_index[project_id]
+    if (assignment < 0).any():
+        missing = arrays.matr_numbers[assignment < 0][0]
+        raise ValueError(f"Student with matriculation number {missing} is not assigned to a project.")
+    return LocalSearch(arrays, assignment, _roles_from_solution(arrays, assignment, solution))
+
+
+def improve(
+    instance: Instance,
+    solution: Solution,
+    time_limit: float = 10.0,
+    max_passes: Optional[int] = None,
+) -> Solution:
+    """
+    Polishes a feasible solution with moves and swaps without calling Gurobi. The returned solution is
+    never worse than the given one with respect to the lexicographic order of the solver objectives,
+    if the search finds no improvement the given solution is returned.
+    """
+    arrays = InstanceArrays.from_instance(instance)
+    search = search_from_solution(arrays, solution)
+    # the programming objective of the given roles, the recovered roles can only be fewer if they are invalid
+    rating, _, friends, max_deviation = search.objective()
+    before = search._key(rating, sum(solution.roles.values()), friends, max_deviation)
+    search.run(time_limit=time_limit, max_passes=max_passes)
+    if search._key(*search.objective()) <= before:
+        return solution
+
+    projects = {int(project_id): [] for project_id in arrays.project_ids}
+    roles = {}
+    for i, student in enumerate(instance.students):
+        projects[int(arrays.project_ids[search.assignment[i]])].append(student)
+        roles[student.matr_number] = search._role_skill(i, search.roles[i])
+    return Solution(projects=projects, roles=roles)
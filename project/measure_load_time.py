@@ -0,0 +1,37 @@
+import argparse
+import time
+
+from instance_loader import load_instance
+
+# Reports the load time of an instance with full validation and over the trusted path.
+#
+# usage: python measure_load_time.py instances/data_s1000_g100.json --repeat 5
+
+
+def _best_time(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the load time of an instance.")
+    parser.add_argument("filepath", nargs="?", default="./instances/data_s1000_g100.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    validated = _best_time(lambda: load_instance(args.filepath, trusted=False), args.repeat)
+    # the first trusted load validates the file and remembers its hash
+    load_instance(args.filepath)
+    trusted = _best_time(lambda: load_instance(args.filepath), args.repeat)
+
+    print(f"{args.filepath}")
+    print(f"  full validation: {validated * 1000:8.1f} ms")
+    print(f"  trusted load:    {trusted * 1000:8.1f} ms ({validated / trusted:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from typing import Optional
+
+import numpy as np
+from data_schema import Instance, Solution
+from instance_arrays import InstanceArrays
+
+
+class Metrics:
+    """
+    All statistics of a solution. The solution is converted once into an assignment vector and a role vector,
+    everything else is computed with vectorized operations on the arrays of the instance.
+    Per-project arrays follow the order of `project_ids`, i.e. the order of `instance.projects`.
+    """
+
+    def __init__(
+        self,
+        instance: Instance,
+        solution: Solution,
+        arrays: Optional[InstanceArrays] = None,
+    ) -> None:
+        a = arrays if arrays is not None else InstanceArrays.from_instance(instance)
+        self.arrays = a
+        self.project_ids = a.project_ids
+        self.project_names = np.array(
+            [instance.projects[int(project_id)].name for project_id in a.project_ids]
+        )
+        # positions of the projects of the solution, in the order of the solution
+        self.solution_order = np.array(
+            [a.project_index[project_id] for project_id in solution.projects],
+            dtype=np.int64,
+        )
+
+        # project index of every student, -1 if unassigned
+        self.assignment = np.full(a.number_students, -1, dtype=np.int64)
+        for project_id, students in solution.projects.items():
+            j = a.project_index[project_id]
+            for student in students:
+                self.assignment[a.student_index[student.matr_number]] = j
+        self.roles = np.array(
+            [solution.roles.get(int(matr_number), 0) for matr_number in a.matr_numbers],
+            dtype=np.int64,
+        )
+
+        assigned = np.flatnonzero(self.assignment >= 0)
+        projects = self.assignment[assigned]
+        ratings = a.ratings[assigned, projects]
+
+        # ratings 1 to 5 of the assigned projects
+        self.rating_histogram = np.bincount(ratings, minlength=6)[1:6]
+        self.avg_rating = ratings.sum() / a.number_students
+
+        self.sizes = np.bincount(projects, minlength=a.number_projects)
+        rating_sums = np.bincount(projects, weights=ratings, minlength=a.number_projects)
+        self.avg_project_rating = np.divide(
+            rating_sums,
+            self.sizes,
+            out=np.zeros(a.number_projects),
+            where=self.sizes > 0,
+        )
+        self.utilization = self.sizes / a.capacity
+
+        # a role with skill level 4 fulfills one required position
+        requirement_counts = a.requirements.sum(axis=1)
+        fulfilled = np.bincount(
+            projects, weights=self.roles[assigned] / 4, minlength=a.number_projects
+        )
+        self.requirement_coverage = np.divide(
+            fulfilled,
+            requirement_counts,
+            out=np.ones(a.number_projects),
+            where=requirement_counts > 0,
+        )
+
+        # one edge per student and friend, satisfied if both are in the same project
+        students, slots = np.nonzero(a.friends >= 0)
+        friends = a.friends[students, slots]
+        self.friend_edges = np.stack(
+            [a.matr_numbers[students], a.matr_numbers[friends]], axis=1
+        )
+        self.friend_satisfied = (self.assignment[students] >= 0) & (
+            self.assignment[students] == self.assignment[friends]
+        )
+
+        self.opt_size = a.opt_size
+        self.size_deviation = self.sizes - a.opt_size
+
+    @property
+    def median_group_size(self) -> int:
+        group_sizes = np.sort(self.sizes[self.solution_order])
+        return int(group_sizes[round(len(group_sizes) / 2)])
+
+    @property
+    def avg_utilization(self) -> float:
+        return float(self.utilization[self.solution_order].mean())
+
+    @property
+    def friends_satisfied(self) -> int:
+        return int(self.friend_satisfied.sum())
+
+    @property
+    def friends_unsatisfied(self) -> int:
+        return int((~self.friend_satisfied).sum())
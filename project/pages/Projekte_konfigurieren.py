@@ -1,50 +1,15 @@
-import json
-import os
 import re
-from pathlib import Path
 
 import streamlit as st
 import streamlit_authenticator as stauth
 import yaml
-from data_schema import Project
+from registration_cache import get_store, invalidate_projects
 from yaml.loader import SafeLoader
 
 
 def create_project():
-    # determine project id (only works if no projects are deleted)
-    file_paths = []
-    directory = "instances/projects"
-    path = Path(directory)
-    path.mkdir(parents=True, exist_ok=True)
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            file_paths.append(f"{directory}/{filename}")
-    ids = [int(re.search(r'\d+', path).group()) for path in file_paths]
-    id = max(ids) + 1 if len(ids) > 0 else 0
-
-    vetos = []
-    if veto != "":
-        data = {
-            id: veto
-        }
-        veto_file = "instances/veto.json"
-        if os.path.exists(veto_file):
-            with open(veto_file, 'r') as file:
-                    existing_data = json.load(file)
-        else:
-            existing_data = {}
-
-        new_veto = {
-            id: int(veto)
-        }
-        existing_data.update(new_veto)
-
-        with open(veto_file, 'w') as file:
-            json.dump(existing_data, file, indent=2)
-
-
-    data = Project(
-        id=id,
+    # the store picks the next free id in the same transaction as the insert
+    get_store().create_project(
         name=name,                         #TODO: add opt_size
         capacity=int(capacity),
         min_capacity=int(min_capacity),
@@ -55,11 +20,10 @@ def create_project():
             "SQL": int(sql),
             "PHP": int(php),
         },
-        veto=vetos
-    ).model_dump_json(indent=2)
-
-    with open(f"instances/projects/data_{id}.json", "w") as f:
-        f.write(data)
+        vetoes=[int(veto)] if veto != "" else [],
+    )
+    # the registration form shows the new project on its next rerun
+    invalidate_projects()
     st.success(f"Das Projekt {name} wurde angelegt.", icon="✅")
 
 def validate_inputs(name, capacity, min_capacity):
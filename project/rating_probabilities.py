@@ -0,0 +1,23 @@
+from typing import List
+
+# The probabilities of the ratings 1 to 5 used by all data generators. They used to be computed with a CP-SAT
+# model per call, the closed form below gives an optimal solution of the same model without a solver:
+# every rating gets the minimum of 10 % and the remaining 50 % are split between two neighbouring ratings,
+# such that the expected value is int(average_rating * 100) / 100 whenever that is reachable.
+
+
+def calculate_rating_probabilities(average_rating: float) -> List[float]:
+    """
+    Returns the probabilities of the ratings 1 to 5 whose expected value is as close as possible to the average
+    rating, where every rating has a probability of at least 10 %.
+    """
+    # 50 of the 100 percent are fixed at 10 % per rating, the remaining 50 are split between two neighbouring ratings
+    remaining = min(max(int(average_rating * 100) - 150, 50), 250)
+    rating, rest = divmod(remaining, 50)
+    percentages = [10] * 5
+    if rating == 5:
+        percentages[4] += 50
+    else:
+        percentages[rating - 1] += 50 - rest
+        percentages[rating] += rest
+    return [percentage / 100 for percentage in percentages]
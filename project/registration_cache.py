@@ -0,0 +1,43 @@
+import time
+
+import streamlit as st
+
+# Resources of the registration store that are shared by all pages and sessions of the Streamlit server.
+
+
+@st.cache_resource
+def get_store():
+    # one connection for all sessions, the store serializes the writes
+    from registration_store import RegistrationStore
+
+    return RegistrationStore()
+
+
+# seconds between two reads of the projects version in a session
+VERSION_CHECK_INTERVAL = 1.0
+
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def _load_projects(version):  # noqa: ARG001
+    # `version` is only the cache key, a new version of the store loads the catalogue again
+    return get_store().projects()
+
+
+def get_projects():
+    """
+    Returns the project catalogue for the registration form. The catalogue is served from memory as long as the
+    projects version of the store is unchanged. Reading the version is a small query, a session reads it at most
+    once per VERSION_CHECK_INTERVAL, so quick form reruns do not touch the database and changes of other
+    processes show up after at most that interval.
+    """
+    state = st.session_state
+    now = time.monotonic()
+    if now - state.get("projects_version_checked", float("-inf")) >= VERSION_CHECK_INTERVAL:
+        state["projects_version"] = get_store().projects_version()
+        state["projects_version_checked"] = now
+    return _load_projects(state["projects_version"])
+
+
+def invalidate_projects():
+    # an update of a project through the shared connection does not change the version
+    _load_projects.clear()
@@ -0,0 +1,341 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+# the models are imported where they are needed, so the registration form can list the projects without pydantic
+if TYPE_CHECKING:
+    from data_schema import Instance, Project, Student
+
+# A SQLite store for the registrations of the students, the projects and the vetoes. The database runs in WAL
+# mode, so the registration form can insert while the admin page exports, and every registration is written in
+# one transaction. The instance is exported with a few indexed queries instead of reading one file per student.
+#
+# usage: python registration_store.py import          (imports instances/students, instances/projects, instances/veto.json)
+#        python registration_store.py export          (writes instances/SEP_data.json)
+
+DEFAULT_DATABASE = "instances/registrations.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    matr_number INTEGER PRIMARY KEY,
+    last_name TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    programming_language_ratings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS friends (
+    matr_number INTEGER NOT NULL REFERENCES students (matr_number) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    friend INTEGER NOT NULL,
+    PRIMARY KEY (matr_number, position)
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    min_capacity INTEGER NOT NULL,
+    programming_requirements TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    matr_number INTEGER NOT NULL REFERENCES students (matr_number) ON DELETE CASCADE,
+    project_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    PRIMARY KEY (matr_number, project_id)
+);
+CREATE TABLE IF NOT EXISTS vetoes (
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    matr_number INTEGER NOT NULL,
+    PRIMARY KEY (project_id, matr_number)
+);
+CREATE INDEX IF NOT EXISTS vetoes_by_student ON vetoes (matr_number);
+"""
+
+
+class RegistrationStore:
+    """
+    Students, projects and vetoes in a SQLite database. One store can be shared by the threads of a Streamlit server.
+    """
+
+    def __init__(self, path: str = DEFAULT_DATABASE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # transactions are started explicitly, so concurrent writers wait for the lock instead of failing
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _write(self, statements):
+        # runs (sql, parameters) pairs in one write transaction
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, parameters in statements:
+                    if isinstance(parameters, list):
+                        cursor.executemany(sql, parameters)
+                    else:
+                        cursor.execute(sql, parameters)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _read(self, queries):
+        # runs the queries in one read transaction, so they all see the same snapshot of the WAL
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                return [cursor.execute(sql).fetchall() for sql in queries]
+            finally:
+                cursor.execute("COMMIT")
+
+    def add_student(self, student: "Student"):
+        """
+        Inserts a registration, a repeated registration with the same matriculation number replaces the old one.
+        """
+        self._write(
+            [
+                ("DELETE FROM students WHERE matr_number = ?", (student.matr_number,)),
+                (
+                    "INSERT INTO students VALUES (?, ?, ?, ?)",
+                    (
+                        student.matr_number,
+                        student.last_name,
+                        student.first_name,
+                        json.dumps(student.programming_language_ratings),
+                    ),
+                ),
+                (
+                    "INSERT INTO friends VALUES (?, ?, ?)",
+                    [
+                        (student.matr_number, position, friend)
+                        for position, friend in enumerate(student.friends)
+                    ],
+                ),
+                (
+                    "INSERT INTO ratings VALUES (?, ?, ?)",
+                    [
+                        (student.matr_number, project_id, rating)
+                        for project_id, rating in student.projects_ratings.items()
+                    ],
+                ),
+            ]
+        )
+
+    def add_project(self, project: "Project", vetoes: List[int] = ()):
+        self._write(
+            [
+                ("DELETE FROM projects WHERE id = ?", (project.id,)),
+                (
+                    "INSERT INTO projects VALUES (?, ?, ?, ?, ?)",
+                    (
+                        project.id,
+                        project.name,
+                        project.capacity,
+                        project.min_capacity,
+                        json.dumps(project.programming_requirements),
+                    ),
+                ),
+                (
+                    "INSERT OR IGNORE INTO vetoes VALUES (?, ?)",
+                    [(project.id, matr_number) for matr_number in vetoes]
+                    + [(project.id, student.matr_number) for student in project.veto],
+                ),
+            ]
+        )
+
+    def create_project(
+        self,
+        name: str,
+        capacity: int,
+        min_capacity: int,
+        programming_requirements: Dict[str, int],
+        vetoes: List[int] = (),
+    ) -> "Project":
+        """
+        Validates and inserts a new project with the next free id. The id is chosen inside the write transaction,
+        so two admins can not create projects with the same id.
+        """
+        from data_schema import Project
+
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                (project_id,) = cursor.execute(
+                    "SELECT COALESCE(MAX(id) + 1, 0) FROM projects"
+                ).fetchone()
+                project = Project(
+                    id=project_id,
+                    name=name,
+                    capacity=capacity,
+                    min_capacity=min_capacity,
+                    programming_requirements=programming_requirements,
+                    veto=[],
+                )
+                cursor.execute(
+                    "INSERT INTO projects VALUES (?, ?, ?, ?, ?)",
+                    (
+                        project.id,
+                        project.name,
+                        project.capacity,
+                        project.min_capacity,
+                        json.dumps(project.programming_requirements),
+                    ),
+                )
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO vetoes VALUES (?, ?)",
+                    [(project.id, matr_number) for matr_number in vetoes],
+                )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return project
+
+    def add_veto(self, project_id: int, matr_number: int):
+        self._write([("INSERT OR IGNORE INTO vetoes VALUES (?, ?)", (project_id, matr_number))])
+
+    def projects(self) -> List[Dict]:
+        """
+        Returns id, name, capacity and min_capacity of all projects, ordered by id.
+        """
+        rows = self._query("SELECT id, name, capacity, min_capacity FROM projects ORDER BY id")
+        return [
+            {"id": id, "name": name, "capacity": capacity, "min_capacity": min_capacity}
+            for id, name, capacity, min_capacity in rows
+        ]
+
+    def projects_version(self) -> tuple:
+        """
+        Returns a marker that changes when the projects may have changed: the data version of SQLite counts the
+        commits of other connections, the number and largest id of the projects cover the inserts of this one.
+        """
+        version_rows, project_rows = self._read(
+            ["PRAGMA data_version", "SELECT COUNT(*), MAX(id) FROM projects"]
+        )
+        return (version_rows[0][0], *project_rows[0])
+
+    def number_of_students(self) -> int:
+        return self._query("SELECT COUNT(*) FROM students")[0][0]
+
+    def export_data(self) -> Dict:
+        """
+        Returns the instance as JSON data. Vetoes of students that did not register are left out.
+        """
+        student_rows, rating_rows, friend_rows, project_rows, veto_rows = self._read(
+            [
+                "SELECT * FROM students ORDER BY matr_number",
+                "SELECT * FROM ratings",
+                "SELECT * FROM friends ORDER BY matr_number, position",
+                "SELECT * FROM projects ORDER BY id",
+                "SELECT vetoes.project_id, vetoes.matr_number FROM vetoes"
+                " JOIN students ON students.matr_number = vetoes.matr_number",
+            ]
+        )
+
+        students = {}
+        for matr_number, last_name, first_name, language_ratings in student_rows:
+            students[matr_number] = {
+                "last_name": last_name,
+                "first_name": first_name,
+                "matr_number": matr_number,
+                "projects_ratings": {},
+                "programming_language_ratings": json.loads(language_ratings),
+                "friends": [],
+            }
+        for matr_number, project_id, rating in rating_rows:
+            students[matr_number]["projects_ratings"][project_id] = rating
+        for matr_number, _, friend in friend_rows:
+            students[matr_number]["friends"].append(friend)
+
+        projects = {}
+        for id, name, capacity, min_capacity, requirements in project_rows:
+            projects[id] = {
+                "id": id,
+                "name": name,
+                "capacity": capacity,
+                "min_capacity": min_capacity,
+                "veto": [],
+                "programming_requirements": json.loads(requirements),
+            }
+        for project_id, matr_number in veto_rows:
+            projects[project_id]["veto"].append(students[matr_number])
+
+        return {"students": list(students.values()), "projects": projects}
+
+    def export_instance(self) -> "Instance":
+        from data_schema import Instance
+
+        return Instance.model_validate(self.export_data())
+
+    def export_json(self, filepath: str = "instances/SEP_data.json") -> "Instance":
+        """
+        Validates the registrations and writes them as instance JSON.
+        """
+        instance = self.export_instance()
+        with open(filepath, "w") as f:
+            f.write(instance.model_dump_json(indent=4))
+        return instance
+
+
+def import_json_directories(
+    store: RegistrationStore,
+    students_directory: str = "instances/students",
+    projects_directory: str = "instances/projects",
+    veto_file: Optional[str] = "instances/veto.json",
+):
+    """
+    Imports the registrations that were written as one JSON file per student and project.
+    """
+    from data_schema import Project, Student
+
+    if os.path.isdir(projects_directory):
+        for filename in sorted(os.listdir(projects_directory)):
+            if filename.endswith(".json"):
+                with open(os.path.join(projects_directory, filename)) as f:
+                    store.add_project(Project.model_validate_json(f.read()))
+    if veto_file and os.path.exists(veto_file):
+        with open(veto_file) as f:
+            for project_id, matr_number in json.load(f).items():
+                store.add_veto(int(project_id), int(matr_number))
+    if os.path.isdir(students_directory):
+        for filename in sorted(os.listdir(students_directory)):
+            if filename.endswith(".json"):
+                with open(os.path.join(students_directory, filename)) as f:
+                    store.add_student(Student.model_validate_json(f.read()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and export the registrations.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--out", default="instances/SEP_data.json")
+    args = parser.parse_args()
+
+    store = RegistrationStore(args.database)
+    if args.command == "import":
+        import_json_directories(store)
+        print(f"{store.number_of_students()} students in {args.database}")
+    else:
+        instance = store.export_json(args.out)
+        print(f"{len(instance.students)} students and {len(instance.projects)} projects written to {args.out}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+from benchmark_runner import run_benchmark, write_results
+from data_schema import Instance, Project, Student
+from rating_probabilities import calculate_rating_probabilities
+
+# Generates instances along one axis at a time (students, projects, friend density, veto density, rating skew)
+# starting from a base point, solves each of them under a time budget and fits empirical scaling curves
+# y = c * x^b for the build time, the solve time and the peak memory.
+#
+# usage: python scaling_sweep.py --axes students projects --budget 60 --out sweep
+
+BASE_POINT = {
+    "students": 200,
+    "projects": 20,
+    "friend_density": 0.3,
+    "veto_density": 0.01,
+    "rating_skew": 0.5,
+}
+
+AXES = {
+    "students": [100, 200, 400, 800, 1600],
+    "projects": [10, 20, 40, 80],
+    "friend_density": [0.0, 0.3, 0.6, 0.9],
+    "veto_density": [0.0, 0.01, 0.05, 0.1],
+    "rating_skew": [0.0, 0.5, 1.0, 2.0],
+}
+
+LANGUAGES = ["Python", "Java", "C/C++", "SQL", "PHP"]
+
+MEASURES = ["build_time", "solve_time", "peak_rss_mb"]
+
+
+def generate_instance(
+    students: int,
+    projects: int,
+    friend_density: float,
+    veto_density: float,
+    rating_skew: float,
+    seed: int = 0,
+) -> Instance:
+    """
+    Generates an instance for one point of the sweep. The friend density is the share of students in friend groups,
+    the veto density the probability of a veto per student and project and the rating skew the standard deviation
+    of the average project ratings around 3.
+    """
+    rng = np.random.default_rng(seed)
+
+    capacity = max(5, math.ceil(1.3 * students / projects))
+    average_ratings = np.clip(3 + rating_skew * rng.standard_normal(projects), 1, 5)
+    cumulative = np.cumsum([calculate_rating_probabilities(rating) for rating in average_ratings], axis=1)
+    ratings = (rng.random((students, projects, 1)) > cumulative[None, :, :4]).sum(axis=2) + 1
+    skills = rng.integers(1, 5, size=(students, len(LANGUAGES)))
+
+    friends = {i: [] for i in range(students)}
+    order = rng.permutation(students)[: int(friend_density * students)]
+    position = 0
+    while position + 2 <= len(order):
+        size = min(int(rng.integers(2, 4)), len(order) - position)
+        group = [int(i) for i in order[position : position + size]]
+        for i in group:
+            friends[i] = [j for j in group if j != i]
+        position += size
+
+    student_models = [
+        Student(
+            last_name="Doe",
+            first_name="Joe",
+            matr_number=i,
+            projects_ratings={j: int(ratings[i, j]) for j in range(projects)},
+            programming_language_ratings={
+                language: int(skills[i, lang_idx]) for lang_idx, language in enumerate(LANGUAGES)
+            },
+            friends=friends[i],
+        )
+        for i in range(students)
+    ]
+    vetos = rng.random((students, projects)) < veto_density
+    project_models = {
+        j: Project(
+            id=j,
+            name=str(j),
+            capacity=capacity,
+            min_capacity=5,
+            veto=[student_models[i] for i in np.flatnonzero(vetos[:, j])],
+            programming_requirements={
+                language: int(rng.integers(0, 3)) for language in LANGUAGES
+            },
+        )
+        for j in range(projects)
+    }
+    return Instance(students=student_models, projects=project_models)
+
+
+def fit_power_law(xs, ys):
+    """
+    Fits y = c * x^b by least squares in log-log space. Returns (c, b, r2) or None if there are too few points.
+    """
+    points = [(x, y) for x, y in zip(xs, ys) if x and y and x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    log_x = np.log([x for x, _ in points])
+    log_y = np.log([y for _, y in points])
+    b, log_c = np.polyfit(log_x, log_y, 1)
+    residuals = log_y - (b * log_x + log_c)
+    total = ((log_y - log_y.mean()) ** 2).sum()
+    r2 = 1 - (residuals**2).sum() / total if total > 0 else 1.0
+    return math.exp(log_c), b, r2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling sweep of the SEP solver.")
+    parser.add_argument("--axes", nargs="*", default=list(AXES), choices=list(AXES))
+    parser.add_argument("--budget", type=float, default=60, help="time limit per stage in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--predict", type=int, nargs="*", default=[1000, 2000, 5000], help="student numbers to extrapolate")
+    parser.add_argument("--out", default="sweep", help="directory for the instances, results and report")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(args.out, "instances"), exist_ok=True)
+    config = {"name": "sweep", "params": {"TimeLimit": args.budget}}
+
+    report = ["# Scaling sweep", "", f"Base point: {json.dumps(BASE_POINT)}, budget {args.budget}s per stage", ""]
+    all_rows = []
+    for axis in args.axes:
+        rows = []
+        for value in AXES[axis]:
+            point = {**BASE_POINT, axis: value}
+            filepath = os.path.join(args.out, "instances", f"{axis}_{value}.json")
+            instance = generate_instance(seed=args.seed, **point)
+            with open(filepath, "w") as f:
+                f.write(instance.model_dump_json())
+            row = run_benchmark([config], [filepath], [args.seed])[0]
+            row.update({"axis": axis, "value": value})
+            rows.append(row)
+        all_rows.extend(rows)
+
+        report += [f"## {axis}", "", "| measure | c | b | R² |", "| --- | --- | --- | --- |"]
+        for measure in MEASURES:
+            fit = fit_power_law([row["value"] for row in rows], [row.get(measure) for row in rows])
+            if fit is None:
+                report.append(f"| {measure} | - | - | - |")
+                continue
+            c, b, r2 = fit
+            report.append(f"| {measure} | {c:.3g} | {b:.2f} | {r2:.2f} |")
+            if axis == "students":
+                predictions = ", ".join(f"{n}: {c * n ** b:.3g}" for n in args.predict)
+                report.append(f"| {measure} prediction | {predictions} | | |")
+        report.append("")
+
+    write_results(all_rows, os.path.join(args.out, "results"))
+    with open(os.path.join(args.out, "report.md"), "w") as f:
+        f.write("\n".join(report) + "\n")
+    print("\n".join(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import gurobipy as gp
+from data_schema import CompactSolution, Instance
+from gurobipy import GRB
+from instance_loader import load_instance
+from pydantic import BaseModel
+from solver import STAGES, SepSolver
+
+# What-if analysis: the model of an instance is built once and every scenario is solved on a copy of it, with
+# the scenario applied as bound, right-hand side and coefficient changes. The copies are found by the unique
+# variable and constraint names of the solver. The scenarios run in parallel, each in its own environment, and
+# start from the solution of the base model.
+#
+# usage: python scenarios.py instances/SEP_data.json scenarios.json --workers 2 --threads 2
+#
+# scenarios.json: [{"name": "more seats", "capacity": {"3": 12}}, {"name": "without 5", "dropped_projects": [5]}]
+
+# factor of the objective value that the later stages have to keep, same as in SepSolver.solve
+STAGE_BOUNDS = {"rating": 1, "programming": 0.99, "friends": 0.99}
+
+BASE = "base"
+
+
+class Scenario(BaseModel):
+    name: str
+    # project id -> new capacity or minimum capacity
+    capacity: Dict[int, int] = {}
+    min_capacity: Dict[int, int] = {}
+    dropped_projects: List[int] = []
+    # project id -> matriculation numbers that are additionally vetoed
+    vetoes: Dict[int, List[int]] = {}
+
+
+def _translate(expr, variables: Dict[str, gp.Var]):
+    """
+    Rebuilds an expression of the base model with the variables of a copy.
+    """
+    if isinstance(expr, gp.Var):
+        return variables[expr.VarName]
+    if isinstance(expr, (int, float)):
+        return expr
+    if isinstance(expr, gp.LinExpr):
+        return gp.LinExpr(
+            [expr.getCoeff(i) for i in range(expr.size())],
+            [variables[expr.getVar(i).VarName] for i in range(expr.size())],
+        ) + expr.getConstant()
+    raise TypeError(f"Unsupported objective {type(expr)}.")
+
+
+class ScenarioEngine:
+    """
+    Builds the base model of the instance once and solves scenarios on copies of it.
+    """
+
+    def __init__(self, instance: Instance, params: Optional[Dict] = None):
+        self.instance = instance
+        self.params = {"OutputFlag": 0, **(params or {})}
+        self._solver = SepSolver(instance, params=self.params)
+        self._solver._model.update()
+        self._objectives = {stage: self._solver._stage_objective(stage) for stage in STAGES}
+
+        # names of the assignment and role variables, to read the solution of a copy
+        self._assignment_names = [
+            (student.matr_number, project.id, entry["var"].VarName)
+            for (student, project), entry in self._solver._studentProjectVars
+        ]
+        self._role_names = [
+            (student, project.id, programming_language, var.VarName)
+            for (programming_language, student, project), var in self._solver._programmingVars
+        ]
+        self.base_result = None
+        self._copy_lock = threading.Lock()
+
+    def _apply(self, model: gp.Model, scenario: Scenario):
+        projects = self.instance.projects
+        changed = set(scenario.capacity) | set(scenario.min_capacity) | set(scenario.dropped_projects)
+        for project_id in changed:
+            capacity = scenario.capacity.get(project_id, projects[project_id].capacity)
+            min_capacity = scenario.min_capacity.get(project_id, projects[project_id].min_capacity)
+            empty = model.getVarByName(f"e_{project_id}")
+            model.getConstrByName(f"capacity_{project_id}").RHS = capacity
+            # sum x - capacity * e <= 0 and sum x - min_capacity * e >= 0
+            model.chgCoeff(model.getConstrByName(f"empty_max_{project_id}"), empty, -capacity)
+            model.chgCoeff(model.getConstrByName(f"empty_min_{project_id}"), empty, -min_capacity)
+            # deviation - sum x == -opt_size, a dropped project has the optimal size 0
+            opt_size = 0 if project_id in scenario.dropped_projects else int((capacity + min_capacity) / 2)
+            model.getConstrByName(f"deviation_{project_id}").RHS = -opt_size
+        for project_id in scenario.dropped_projects:
+            model.getVarByName(f"e_{project_id}").UB = 0
+            for student in self.instance.students:
+                model.getVarByName(f"x_{student.matr_number}_{project_id}").UB = 0
+        for project_id, matr_numbers in scenario.vetoes.items():
+            for matr_number in matr_numbers:
+                model.getVarByName(f"x_{matr_number}_{project_id}").UB = 0
+
+    def _warm_start(self, model: gp.Model, scenario: Scenario):
+        # partial start: every student that may stay in the project of the base solution starts there,
+        # Gurobi completes the remaining students
+        if self.base_result is None or self.base_result["solution"] is None:
+            return
+        base = self.base_result["solution"]
+        for matr_number, project_id in zip(base.matr_numbers, base.projects):
+            if project_id in scenario.dropped_projects or matr_number in scenario.vetoes.get(project_id, []):
+                continue
+            model.getVarByName(f"x_{matr_number}_{project_id}").Start = 1
+
+    def _solve_copy(self, model: gp.Model, scenario: Scenario) -> Dict:
+        """
+        Runs the lexicographic stages on a prepared copy and returns the objective values and the solution.
+        A stage that stops early (e.g. at the time limit) with a solution continues with its best objective value.
+        """
+        variables = {var.VarName: var for var in model.getVars()}
+        result = {"scenario": scenario.name, "status": "optimal", "runtime": 0.0, "mip_gaps": {}, "solution": None}
+        start = time.time()
+        for stage in STAGES:
+            expr, sense = self._objectives[stage]
+            objective = _translate(expr, variables)
+            model.setObjective(objective, sense)
+            model.optimize()
+            result["runtime"] += model.Runtime
+            if model.Status == GRB.INFEASIBLE:
+                result["status"] = "infeasible"
+                break
+            if model.SolCount == 0:
+                result["status"] = f"no solution (status {model.Status})"
+                break
+            if model.Status != GRB.OPTIMAL:
+                result["status"] = "time limit" if model.Status == GRB.TIME_LIMIT else f"status {model.Status}"
+            result[stage] = model.ObjVal
+            result["mip_gaps"][stage] = model.MIPGap
+            if stage in STAGE_BOUNDS:
+                model.addConstr(objective >= model.ObjVal * STAGE_BOUNDS[stage])
+        result["wall_time"] = time.time() - start
+
+        if model.SolCount > 0 and all(stage in result for stage in STAGES):
+            roles = {}
+            for student, _project_id, programming_language, name in self._role_names:
+                if variables[name].X > 0.5:
+                    roles[student.matr_number] = student.programming_language_ratings[programming_language]
+            matr_numbers, projects = [], []
+            for matr_number, project_id, name in self._assignment_names:
+                if variables[name].X > 0.5:
+                    matr_numbers.append(matr_number)
+                    projects.append(project_id)
+            result["solution"] = CompactSolution(
+                matr_numbers=matr_numbers,
+                projects=projects,
+                roles=[roles.get(matr_number, 0) for matr_number in matr_numbers],
+            )
+        return result
+
+    def validate(self, scenario: Scenario):
+        """
+        Raises a ValueError if the scenario refers to projects or students that are not in the instance.
+        """
+        matr_numbers = {student.matr_number for student in self.instance.students}
+        project_ids = (
+            set(scenario.capacity) | set(scenario.min_capacity) | set(scenario.dropped_projects) | set(scenario.vetoes)
+        )
+        unknown_projects = project_ids - set(self.instance.projects)
+        if unknown_projects:
+            raise ValueError(f"Scenario {scenario.name!r} refers to unknown projects {sorted(unknown_projects)}.")
+        unknown_students = {
+            matr_number for vetoed in scenario.vetoes.values() for matr_number in vetoed
+        } - matr_numbers
+        if unknown_students:
+            raise ValueError(f"Scenario {scenario.name!r} refers to unknown students {sorted(unknown_students)}.")
+
+    def _run(self, scenario: Scenario, threads: int) -> Dict:
+        """
+        Copies the base model into a new environment, applies the scenario and solves it. The copy and its
+        environment only live for this call, so at most one environment per worker exists at a time.
+        """
+        # every copy gets its own environment, so the copies can be solved in parallel threads
+        env = gp.Env(params={"OutputFlag": 0})
+        model = None
+        try:
+            # copying reads the shared base model, so only one thread copies at a time
+            with self._copy_lock:
+                model = self._solver._model.copy(env)
+            for param, value in {**self.params, "Threads": threads}.items():
+                model.setParam(param, value)
+            self._apply(model, scenario)
+            self._warm_start(model, scenario)
+            return self._solve_copy(model, scenario)
+        finally:
+            if model is not None:
+                model.dispose()
+            env.dispose()
+
+    def solve_base(self, threads: int = 0) -> Dict:
+        if self.base_result is None:
+            self.base_result = self._run(Scenario(name=BASE), threads)
+        return self.base_result
+
+    def solve(self, scenarios: List[Scenario], workers: int = 1, threads: int = 1) -> List[Dict]:
+        """
+        Solves the base model and the scenarios, at most `workers` scenarios at a time with `threads` threads each.
+        Returns the results of the base model and of the scenarios in the given order.
+        """
+        for scenario in scenarios:
+            self.validate(scenario)
+        self.solve_base(threads * workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda scenario: self._run(scenario, threads), scenarios))
+        return [self.base_result, *results]
+
+    def dispose(self):
+        self._solver.dispose()
+
+
+def comparison_table(results: List[Dict]) -> str:
+    """
+    Formats the objective values of the scenarios and their differences to the base model as Markdown table.
+    """
+    base = results[0]
+    lines = [
+        "| scenario | status | " + " | ".join(STAGES) + " | runtime |",
+        "| --- | --- | " + " | ".join("---" for _ in STAGES) + " | --- |",
+    ]
+    for result in results:
+        values = []
+        for stage in STAGES:
+            value = result.get(stage)
+            if value is None:
+                values.append("-")
+            elif result is base or base.get(stage) is None:
+                values.append(f"{value:g}")
+            else:
+                values.append(f"{value:g} ({value - base[stage]:+g})")
+        lines.append(
+            f"| {result['scenario']} | {result['status']} | " + " | ".join(values) + f" | {result['runtime']:.1f}s |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare what-if scenarios of an instance.")
+    parser.add_argument("instance")
+    parser.add_argument("scenarios", help="JSON file with a list of scenarios")
+    parser.add_argument("--workers", type=int, default=1, help="scenarios solved at the same time")
+    parser.add_argument("--threads", type=int, default=1, help="Gurobi threads per scenario")
+    parser.add_argument("--time-limit", type=float, help="time limit per stage in seconds")
+    args = parser.parse_args()
+
+    with open(args.scenarios) as f:
+        scenarios = [Scenario.model_validate(scenario) for scenario in json.load(f)]
+    params = {"TimeLimit": args.time_limit} if args.time_limit else None
+
+    engine = ScenarioEngine(load_instance(args.instance), params=params)
+    results = engine.solve(scenarios, workers=args.workers, threads=args.threads)
+    engine.dispose()
+    print(comparison_table(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,83 @@
+import glob
+import os
 import time
-from multiprocessing import Process, Value
+import urllib.error
+from typing import TYPE_CHECKING
 
-import pandas as pd
+import solve_client
 import streamlit as st
 import streamlit_authenticator as stauth
-import verify
 import yaml
-from benchmarks import Benchmarks
-from combine_data import combine_data
-from data_schema import Instance, Solution
 from yaml.loader import SafeLoader
 
+if TYPE_CHECKING:
+    from benchmarks import Benchmarks
+    from data_schema import Instance, Solution
+
 # streamlit login documentation: https://github.com/mkhorasani/Streamlit-Authenticator/tree/main?tab=readme-ov-file#authenticatelogin
 
-with open('./login.yaml') as file:
-    config = yaml.load(file, Loader=SafeLoader)
+# The loads below are cached across reruns and sessions. Files are keyed by path and modification time, so a
+# changed file is loaded again, solutions are keyed by their job id. The solution caches are cleared when a job is done.
+# pydantic, pandas and the plotting libraries are imported inside the loaders, so the login page does not
+# wait for them. The mtime arguments are unused in the loaders, they only make the modification time part of the
+# cache key (Streamlit does not hash arguments starting with an underscore, so they can not be renamed).
+
+
+@st.cache_data
+def load_login_config(path: str, mtime: float):  # noqa: ARG001
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+@st.cache_resource
+def load_cached_instance(path: str, mtime: float) -> "Instance":  # noqa: ARG001
+    from instance_loader import load_instance
+
+    return load_instance(path)
+
+
+@st.cache_resource
+def fetch_cached_solution(job_id: str) -> "Solution":
+    return solve_client.fetch_solution(job_id)
+
+
+@st.cache_resource
+def load_benchmarks(job_id: str, instance_path: str, mtime: float) -> "Benchmarks":
+    from benchmarks import Benchmarks
+
+    return Benchmarks(
+        solution=fetch_cached_solution(job_id),
+        instance=load_cached_instance(instance_path, mtime),
+    )
+
+
+@st.cache_data
+def load_charts(job_id: str, instance_path: str, mtime: float):
+    import pandas as pd
+
+    benchmark = load_benchmarks(job_id, instance_path, mtime)
+    y_rating, x_rating = benchmark.log_rating_sums()
+    x_requirements, y_requirements = benchmark.log_programming_requirements()
+    x_util, y_util = benchmark.log_proj_util()
+    return {
+        "rating_sums": pd.DataFrame(x_rating, y_rating),
+        "programming_requirements": pd.DataFrame(y_requirements, x_requirements),
+        "proj_util": pd.DataFrame(y_util, x_util),
+    }
+
+
+def clear_solution_caches():
+    fetch_cached_solution.clear()
+    load_benchmarks.clear()
+    load_charts.clear()
+
 
 st.set_page_config(
     page_title="Konfiguration - Startseite"
 )
 
+config = load_login_config('./login.yaml', os.path.getmtime('./login.yaml'))
+
 authenticator = stauth.Authenticate(
     config['credentials'],
     config['cookie']['name'],
@@ -29,38 +87,6 @@ authenticator = stauth.Authenticate(
 
 name, authentication_status, username = authenticator.login()
 
-def solve_instance(num):
-    solver, instance = verify.genererate_solver("./instances/data_s500_g50.json")
-
-    # manually generated form data
-    #combine_data()  # generate instance from inputs
-    #solver, instance = verify.genererate_solver("./instances/SEP_data.json")
-
-    solution = verify.solve_next_objective(solver=solver,instance=instance)
-    num.value = 0.25
-    if solution is None:
-        num.value = -1
-        return solution, instance
-    solution = verify.solve_next_objective(solver=solver,instance=instance)
-    num.value = 0.5
-    if solution is None:
-        num.value = -1
-        return solution, instance
-    solution = verify.solve_next_objective(solver=solver,instance=instance)
-    num.value = 0.75
-    if solution is None:
-        num.value = -1
-        return solution, instance
-    solution = verify.solve_next_objective(solver=solver,instance=instance)
-    num.value = 1
-
-    #data = solution.model_dump_json(indent=2)
-    #with open("solution/solution_of_sep.json", "w") as f:
-    #    f.write(data)
-
-    return solution, instance
-
-
 if authentication_status:
     authenticator.logout()
     st.write(f'Willkommen, {name}!')
@@ -68,68 +94,84 @@ if authentication_status:
     # SEP-Konfigurator
     """)
 
+    if st.button("Anmeldungen exportieren", help="Schreibt die Anmeldungen nach ./instances/SEP_data.json."):
+        from registration_cache import get_store
+
+        try:
+            instance = get_store().export_json("./instances/SEP_data.json")
+            st.success(f"{len(instance.students)} Anmeldungen für {len(instance.projects)} Projekte exportiert.")
+        except ValueError as e:
+            st.error(f"Die Anmeldungen sind ungültig: {e}")
+
+    # the solver runs in the local solve service (python solve_service.py), this page only submits and polls jobs
+    instance_path = st.selectbox(
+        "Instanz",
+        sorted(glob.glob("./instances/*.json")),
+        help="./instances/SEP_data.json wird aus den Anmeldungen exportiert.",
+    )
     assign_project = st.button("Projektzuordnung berechnen", type="primary")
     if assign_project:
-        num = Value('d', 0)
-        test_data = st.empty()
-        timer = st.empty()
-
-        start = time.time_ns()
-        end = time.time_ns()
-        my_bar = st.progress(0, text="Progress")
-
-        p = Process(target=solve_instance, args=(num,))
-        p.start()
-        while p.is_alive():
-            time.sleep(0.1)
-            end = time.time_ns()
-            progress_text = ""
-
-            if num.value == 0:
-                progress_text = "project rating objective"
-            elif num.value == 0.25:
-                progress_text = "programming rating objective"
-            elif num.value == 0.5:
-                progress_text = "friends rating objective"
-            elif num.value == 0.75:
-                progress_text = "optimal group size objective"
-            else:
-                progress_text = "finished"
-            timer.metric("Elapsed time:", F"{round((end-start)/1000000000, 3)}")
-            if num.value != -1:
-                my_bar.progress(num.value, text=progress_text)
-            else:
-                my_bar.progress(1, text=progress_text)
-
-        if num.value == -1:
+        try:
+            st.session_state["job_id"] = solve_client.submit_instance(instance_path)
+            st.session_state["job_instance_path"] = instance_path
+            st.session_state["job_start"] = time.time()
+        except urllib.error.URLError as e:
+            st.error(f"Der Solve-Service ist nicht erreichbar: {e}")
+
+    job = None
+    if "job_id" in st.session_state:
+        try:
+            job = solve_client.job_status(st.session_state["job_id"])
+        except urllib.error.URLError as e:
+            # the service was restarted (the jobs are only kept in memory) or is not running
+            st.error(f"Die Berechnung ist nicht mehr verfügbar, bitte starte sie neu: {e}")
+            del st.session_state["job_id"]
+
+    if job is not None:
+        progress_text = ""
+        if job["progress"] == 0:
+            progress_text = "project rating objective"
+        elif job["progress"] == 0.25:
+            progress_text = "programming rating objective"
+        elif job["progress"] == 0.5:
+            progress_text = "friends rating objective"
+        elif job["progress"] == 0.75:
+            progress_text = "optimal group size objective"
+        else:
+            progress_text = "finished"
+        if job["status"] == "queued":
+            progress_text = "waiting for a free solver"
+
+        if job["status"] not in ("done", "infeasible", "error"):
+            st.metric("Elapsed time:", F"{round(time.time() - st.session_state['job_start'], 3)}")
+            st.progress(job["progress"], text=progress_text)
+            # poll again without blocking the other sessions of the server
+            time.sleep(0.5)
+            st.rerun()
+        elif job["status"] == "infeasible":
+            st.progress(1.0, text=progress_text)
             st.write("!!! INFEASIBLE SOLUTION !!!")
+        elif job["status"] == "error":
+            st.error(job["error"])
         else:
-            with open("solution/solution_of_50_500.json") as f:
-            #with open("solution/solution_of_sep.json") as f:
-                solution: Solution = Solution.model_validate_json(f.read())
-
-            with open("./instances/data_s500_g50.json") as f:
-            #with open("./instances/SEP_data.json") as f:
-                instance: Instance = Instance.model_validate_json(f.read())
-            benchmark = Benchmarks(solution=solution, instance=instance)
+            # the first time the job is seen as done, so charts cached while it was running are not shown
+            if st.session_state.get("job_done") != st.session_state["job_id"]:
+                clear_solution_caches()
+                st.session_state["job_done"] = st.session_state["job_id"]
+            st.progress(1.0, text=progress_text)
+            instance_path = st.session_state["job_instance_path"]
+            charts = load_charts(
+                st.session_state["job_id"], instance_path, os.path.getmtime(instance_path)
+            )
 
             st.write("""average ratings project""")
-
-            y_rating, x_rating = benchmark.log_rating_sums()
-            chart_data = pd.DataFrame(x_rating, y_rating)
-            st.bar_chart(chart_data)
+            st.bar_chart(charts["rating_sums"])
 
             st.write("""percentage programming requirements""")
-
-            x,y = benchmark.log_programming_requirements()
-            chart_data = pd.DataFrame(y, x)
-            st.bar_chart(chart_data)
+            st.bar_chart(charts["programming_requirements"])
 
             st.write("""project utilization""")
-
-            x,y = benchmark.log_proj_util()
-            chart_data = pd.DataFrame(y, x)
-            st.bar_chart(chart_data)
+            st.bar_chart(charts["proj_util"])
 
 
 elif authentication_status is False:
@@ -0,0 +1,81 @@
+import json
+from typing import Iterator, Tuple
+
+from data_schema import CompactSolution, Instance, Solution
+
+# Compact solutions are stored as JSON lines: a header line followed by one line per student
+# with its matriculation number, project and role, e.g.
+#
+#   {"format": "compact_solution", "version": 1}
+#   [4711, 3, 2]
+#
+# The lines are written and read one at a time, so a solution never has to be held as a whole string.
+
+HEADER = {"format": "compact_solution", "version": 1}
+
+
+class SolutionWriter:
+    """
+    Streams the assignment of the students to a file. The file is opened and closed by the context manager:
+
+        with SolutionWriter(filepath) as writer:
+            writer.write(matr_number, project_id, role)
+    """
+
+    def __init__(self, filepath: str):
+        self._filepath = filepath
+        self._file = None
+
+    def write(self, matr_number: int, project_id: int, role: int):
+        self._file.write(f"[{int(matr_number)}, {int(project_id)}, {int(role)}]\n")
+
+    def __enter__(self):
+        # closed in __exit__, the writer itself is the context manager of the file
+        self._file = open(self._filepath, "w")  # noqa: SIM115
+        self._file.write(json.dumps(HEADER) + "\n")
+        return self
+
+    def __exit__(self, *args):
+        self._file.close()
+        self._file = None
+
+
+def iter_solution(filepath: str) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yields (matr_number, project id, role) for every student of a compact solution file.
+    """
+    with open(filepath) as f:
+        header = json.loads(f.readline())
+        if header.get("format") != HEADER["format"]:
+            raise ValueError(f"{filepath} is not a compact solution file.")
+        for line in f:
+            if line.strip():
+                matr_number, project_id, role = json.loads(line)
+                yield matr_number, project_id, role
+
+
+def write_solution(solution, filepath: str):
+    """
+    Writes a `Solution` or a `CompactSolution` as compact solution file.
+    """
+    if isinstance(solution, Solution):
+        solution = CompactSolution.from_solution(solution)
+    with SolutionWriter(filepath) as writer:
+        for row in zip(solution.matr_numbers, solution.projects, solution.roles):
+            writer.write(*row)
+
+
+def read_solution(filepath: str) -> CompactSolution:
+    matr_numbers, projects, roles = [], [], []
+    for matr_number, project_id, role in iter_solution(filepath):
+        matr_numbers.append(matr_number)
+        projects.append(project_id)
+        roles.append(role)
+    return CompactSolution(matr_numbers=matr_numbers, projects=projects, roles=roles)
+
+
+def read_full_solution(filepath: str, instance: Instance) -> Solution:
+    """
+    Reads a compact solution file and converts it to the full schema.
+    """
+    return read_solution(filepath).to_solution(instance)
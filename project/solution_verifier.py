@@ -0,0 +1,81 @@
+from typing import List, Optional
+
+from data_schema import Instance, Solution
+from pydantic import BaseModel
+
+
+class Violation(BaseModel):
+    kind: str
+    message: str
+    project: Optional[int] = None
+    matr_number: Optional[int] = None
+
+
+def verify_solution(instance: Instance, solution: Solution) -> List[Violation]:
+    """
+    Checks the capacities, the minimum capacities, the vetos and that every student is in exactly one project.
+    The indexes are built once, so the check is linear in the number of students and projects.
+    Returns all violations instead of stopping at the first one.
+    """
+    violations = []
+
+    vetos = {
+        project_id: {student.matr_number for student in project.veto}
+        for project_id, project in instance.projects.items()
+    }
+    assignment_counts = {student.matr_number: 0 for student in instance.students}
+
+    for project_id, students in solution.projects.items():
+        project = instance.projects.get(project_id)
+        if project is None:
+            violations.append(
+                Violation(kind="unknown_project", project=project_id, message=f"Project {project_id} does not exist!")
+            )
+            continue
+        # check every project has a mimium and maximum number of participants or is empty
+        if len(students) > project.capacity:
+            violations.append(
+                Violation(kind="capacity", project=project_id, message=f"Too many students in project: {project_id}!")
+            )
+        if 0 < len(students) < project.min_capacity:
+            violations.append(
+                Violation(
+                    kind="min_capacity",
+                    project=project_id,
+                    message=f"Project {project_id} has {len(students)} students with less then the minimum required of {project.min_capacity}!",
+                )
+            )
+        for student in students:
+            # check if solution complies with project vetos
+            if student.matr_number in vetos[project_id]:
+                violations.append(
+                    Violation(
+                        kind="veto",
+                        project=project_id,
+                        matr_number=student.matr_number,
+                        message=f"The returned solution contains a prohibited student {student.matr_number} in project {project_id}!",
+                    )
+                )
+            if student.matr_number not in assignment_counts:
+                violations.append(
+                    Violation(
+                        kind="unknown_student",
+                        project=project_id,
+                        matr_number=student.matr_number,
+                        message=f"Student {student.matr_number} in project {project_id} does not exist!",
+                    )
+                )
+                continue
+            assignment_counts[student.matr_number] += 1
+
+    # check if every student is contained in exactly one project
+    for matr_number, count in assignment_counts.items():
+        if count != 1:
+            violations.append(
+                Violation(
+                    kind="assignment",
+                    matr_number=matr_number,
+                    message=f"The returned solution contains a student {matr_number} {count} times!",
+                )
+            )
+    return violations
@@ -0,0 +1,53 @@
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from data_schema import Solution
+
+# address of the local solve service started with solve_service.py
+SERVICE_URL = os.environ.get("SEP_SOLVE_SERVICE_URL", "http://127.0.0.1:8765")
+
+
+def _request(path: str, data: Optional[bytes] = None) -> str:
+    request = urllib.request.Request(
+        SERVICE_URL + path,
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST" if data is not None else "GET",
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode("utf-8")
+
+
+def submit_instance(filepath: str) -> str:
+    """
+    Submits the instance file to the solve service and returns the job id.
+    Identical instances are only solved once.
+    """
+    with open(filepath, "rb") as f:
+        return json.loads(_request("/jobs", f.read()))["job_id"]
+
+
+def job_status(job_id: str) -> Dict:
+    """
+    Returns the status, stage and progress of the job.
+    """
+    return json.loads(_request(f"/jobs/{job_id}"))
+
+
+def fetch_solution(job_id: str) -> Optional["Solution"]:
+    """
+    Returns the solution of a finished job or `None` if the job has no solution.
+    """
+    # pydantic is only needed once a solution is shown
+    from data_schema import Solution
+
+    try:
+        return Solution.model_validate_json(_request(f"/jobs/{job_id}/solution"))
+    except urllib.error.HTTPError as e:
+        if e.code == 409:
+            return None
+        raise
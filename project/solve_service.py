@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_schema import Instance
+from pydantic import ValidationError
+from solver import load_stage_params
+from solver_pool import FINISHED, SolverPool
+
+# A local solve daemon with a job queue for the Streamlit front end.
+#
+# POST /jobs                  submit an instance (JSON body), returns {"job_id": ..., "deduplicated": ...}
+# GET  /jobs                  list all jobs with their status
+# GET  /jobs/<id>             status, current stage and progress of a job
+# GET  /jobs/<id>/solution    solution of a finished job
+#
+# Only the last `keep_jobs` finished jobs and their solutions are kept, older ones are forgotten and the same
+# instance is solved again if it is resubmitted.
+#
+# usage: python solve_service.py --port 8765 --workers 2 --keep-jobs 100
+
+
+class SolveService:
+    """
+    Keeps the jobs of the solver pool and deduplicates identical instance submissions.
+    """
+
+    def __init__(self, workers: int = 1, env_params=None, stage_params=None, keep_jobs: int = 100):
+        self._pool = SolverPool(workers=workers, env_params=env_params)
+        self._stage_params = stage_params or {}
+        self._keep_jobs = keep_jobs
+        self._lock = threading.Lock()
+        self._jobs_by_hash = {}
+        self._hash_by_job = {}
+        self._job_ids = []
+
+    @staticmethod
+    def instance_hash(instance_json: str) -> str:
+        # canonical form, so formatting and key order do not matter
+        canonical = json.dumps(json.loads(instance_json), sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def submit(self, instance_json: str):
+        """
+        Validates and queues the instance. Returns the job id and whether an existing job was reused.
+        """
+        instance_hash = self.instance_hash(instance_json)
+        with self._lock:
+            self._forget_old_jobs()
+            job_id = self._jobs_by_hash.get(instance_hash)
+            if job_id is not None and self._pool.status(job_id)["status"] != "error":
+                return job_id, True
+            instance = Instance.model_validate_json(instance_json)
+            job_id = self._pool.submit(instance, stage_params=self._stage_params)
+            self._jobs_by_hash[instance_hash] = job_id
+            self._hash_by_job[job_id] = instance_hash
+            self._job_ids.append(job_id)
+            return job_id, False
+
+    def _forget_old_jobs(self):
+        # called with the lock held, drops the oldest finished jobs beyond keep_jobs
+        finished = [job_id for job_id in self._job_ids if self._pool.status(job_id)["status"] in FINISHED]
+        forgotten = set()
+        for job_id in finished[: max(len(finished) - self._keep_jobs, 0)]:
+            if self._pool.forget(job_id):
+                forgotten.add(job_id)
+                instance_hash = self._hash_by_job.pop(job_id)
+                # a failed job may already be replaced by a new job for the same instance
+                if self._jobs_by_hash.get(instance_hash) == job_id:
+                    del self._jobs_by_hash[instance_hash]
+        if forgotten:
+            self._job_ids = [job_id for job_id in self._job_ids if job_id not in forgotten]
+
+    def status(self, job_id: str):
+        job = self._pool.status(job_id)
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "stage": job["stage"],
+            "progress": job["progress"],
+            "error": job["error"],
+        }
+
+    def jobs(self):
+        # under the lock, so no job is forgotten while the list is built
+        with self._lock:
+            return [self.status(job_id) for job_id in self._job_ids]
+
+    def solution(self, job_id: str):
+        return self._pool.status(job_id)["solution"]
+
+    def close(self):
+        self._pool.close()
+
+
+def _make_handler(service: SolveService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: str):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, code: int, message: str):
+            self._send(code, json.dumps({"error": message}))
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                instance_json = self.rfile.read(length).decode("utf-8")
+                job_id, deduplicated = service.submit(instance_json)
+            # UnicodeDecodeError and a malformed Content-Length are ValueErrors as well
+            except (ValueError, ValidationError) as e:
+                self._send_error(400, str(e))
+                return
+            self._send(
+                200, json.dumps({"job_id": job_id, "deduplicated": deduplicated})
+            )
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/jobs":
+                self._send(200, json.dumps(service.jobs()))
+                return
+            match = re.fullmatch(r"/jobs/([0-9a-f]+)(/solution)?/?", self.path)
+            if match is None:
+                self._send_error(404, f"Unknown path {self.path}")
+                return
+            job_id, solution = match.groups()
+            try:
+                status = service.status(job_id)
+                solution_json = service.solution(job_id) if solution is not None else None
+            # unknown or already forgotten
+            except KeyError:
+                self._send_error(404, f"Unknown job {job_id}")
+                return
+            if solution is None:
+                self._send(200, json.dumps(status))
+            elif status["status"] != "done":
+                self._send_error(409, f"Job {job_id} is {status['status']}")
+            else:
+                self._send(200, solution_json)
+
+        def log_message(self, format, *args):
+            # keep the console of the daemon quiet while the front end polls
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local solve service for SEP instances.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of concurrent solves (licenses)"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=0, help="gurobi threads per solve, 0 = automatic"
+    )
+    parser.add_argument(
+        "--param-dir", help="directory with tuned <stage>.prm files, see tune_params.py"
+    )
+    parser.add_argument(
+        "--keep-jobs", type=int, default=100, help="number of finished jobs whose solutions are kept"
+    )
+    args = parser.parse_args()
+
+    service = SolveService(
+        workers=args.workers,
+        env_params={"Threads": args.threads, "OutputFlag": 0},
+        stage_params=load_stage_params(args.param_dir) if args.param_dir else None,
+        keep_jobs=args.keep_jobs,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(service))
+    print(f"Solve service listening on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
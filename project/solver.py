@@ -1,4 +1,6 @@
-from typing import List
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
 
 import gurobipy as gp
 from data_schema import Instance, Solution, Student
@@ -13,22 +15,75 @@ from solver_objectives import (
     _ProgrammingObjective,
     _RatingObjective,
 )
+from solver_stages import STAGES
 from solver_vars import _EmptyProjectVars, _ProgrammingVars, _StudentProjectVars
 
 
+def read_param_file(filepath: str) -> Dict[str, Any]:
+    """
+    Reads a Gurobi parameter file (one `Name Value` pair per line) into a dictionary.
+    """
+    params = {}
+    with open(filepath) as f:
+        for line in f:
+            content = line.split("#")[0].strip()
+            if not content:
+                continue
+            name, value = content.split()[:2]
+            for convert in (int, float):
+                try:
+                    value = convert(value)
+                    break
+                except ValueError:
+                    pass
+            params[name] = value
+    return params
+
+
+def load_stage_params(directory: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads the parameter files `<stage>.prm` of the directory, e.g. the output of tune_params.py.
+    Stages without a file use the default parameters.
+    """
+    return {
+        stage: read_param_file(os.path.join(directory, f"{stage}.prm"))
+        for stage in STAGES
+        if os.path.exists(os.path.join(directory, f"{stage}.prm"))
+    }
+
+
 class SepSolver:
     """
     A solver to solve the SEP project student assignement incoporating project ratings, programmings skills and friend groups.
+    With `lazy_friends` the friend relations are only modelled for projects both friends like and the remaining linking
+    constraints are added lazily in a callback. If an `env` is given, the model is created in this environment instead
+    of the default one, so long-lived workers can reuse a started environment. The Gurobi `params` are used for all
+    stages, `stage_params` (see `load_stage_params`) additionally for a single stage.
     """
 
-    def __init__(self, instance: Instance):
+    def __init__(
+        self,
+        instance: Instance,
+        lazy_friends: bool = False,
+        env: Optional[gp.Env] = None,
+        params: Optional[Dict[str, Any]] = None,
+        stage_params: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
         self.students = instance.students
         self.projects = list(instance.projects.values())
         self.students_min_rating = self.students_with_minimum_positive_ratings()
 
         self.current_objective = 0
+        self.lazy_friends = lazy_friends
+        self.stage_params = stage_params or {}
+        # values of the parameters before a stage changed them
+        self._default_params = {}
+        # runtime, status and objective of the last optimization of every stage
+        self.stage_stats = {}
 
-        self._model = gp.Model()
+        self._model = gp.Model(env=env) if env is not None else gp.Model()
+        self._params = dict(params or {})
+        self._set_base_params()
 
         self._studentProjectVars = _StudentProjectVars(
             students=self.students, projects=self.projects, model=self._model
@@ -70,6 +125,7 @@ class SepSolver:
             students=self.students,
             projects=self.projects,
             studentProjectVars=self._studentProjectVars,
+            lazy=self.lazy_friends,
         )
         self._optSizeObjective = _OptSizeOjective(
             model=self._model,
@@ -94,6 +150,113 @@ class SepSolver:
             if self.check_minimum_positive_ratings(student) is True
         ]
 
+    def _set_base_params(self):
+        # the parameters the solver was created with, the stage parameters are applied on top of them
+        if self.lazy_friends:
+            self._model.Params.LazyConstraints = 1
+        for param, value in self._params.items():
+            self._model.setParam(param, value)
+
+    def _reset_params(self):
+        self._model.resetParams()
+        self._set_base_params()
+        self._default_params = {}
+
+    def _apply_stage_params(self, stage: str):
+        """
+        Sets the parameters of the stage and restores the ones changed for a previous stage.
+        """
+        stage_params = self.stage_params.get(stage, {})
+        for param, value in self._default_params.items():
+            if param not in stage_params:
+                self._model.setParam(param, value)
+        for param, value in stage_params.items():
+            if param not in self._default_params:
+                self._default_params[param] = self._model.getParamInfo(param)[2]
+            self._model.setParam(param, value)
+
+    def _stage_objective(self, stage: str):
+        """
+        Returns the objective and the sense of the stage.
+        """
+        if stage == "rating":
+            return self._ratingObjective.get(), GRB.MAXIMIZE
+        if stage == "programming":
+            return self._programmingObjective.get(), GRB.MAXIMIZE
+        if stage == "friends":
+            return self._friendsObjective.get(), GRB.MAXIMIZE
+        return self._optSizeObjective.get(), GRB.MINIMIZE
+
+    def _optimize(self, stage: str):
+        """
+        Optimizes the current objective and records the statistics of the stage.
+        """
+        self._apply_stage_params(stage)
+        if self.lazy_friends:
+            self._model.optimize(self._friendsObjective.callback)
+        else:
+            self._model.optimize()
+
+        stats = {
+            "runtime": self._model.Runtime,
+            "status": self._model.Status,
+            "node_count": self._model.NodeCount,
+            "objective": None,
+            "mip_gap": None,
+        }
+        if self._model.SolCount > 0:
+            stats["objective"] = self._model.ObjVal
+            stats["mip_gap"] = self._model.MIPGap
+        self.stage_stats[stage] = stats
+
+    def solve_stage(self, stage: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Solves a single stage again from scratch, with `params` on top of its stage parameters, and returns
+        the statistics of the stage. The bounds added by the stages solved before stay in place.
+        Used to time a stage under different parameters.
+        """
+        stage_params = self.stage_params
+        self.stage_params = {**stage_params, stage: {**stage_params.get(stage, {}), **(params or {})}}
+        try:
+            self._model.reset(1)
+            self._model.setObjective(*self._stage_objective(stage))
+            self._optimize(stage)
+        finally:
+            self.stage_params = stage_params
+        return self.stage_stats[stage]
+
+    def tune_stage(self, stage: str, tune_time_limit: float) -> Optional[Dict[str, Any]]:
+        """
+        Runs Gurobi's tuner on a single stage and returns the best parameter set it found or None.
+        The parameters are reset before, so time limits or seeds of earlier solves do not end up in the result.
+        """
+        self._reset_params()
+        self._model.setObjective(*self._stage_objective(stage))
+        self._model.Params.TuneTimeLimit = tune_time_limit
+        self._model.Params.TuneResults = 1
+        self._model.tune()
+        tuned = None
+        if self._model.TuneResultCount > 0:
+            self._model.getTuneResult(0)
+            with tempfile.TemporaryDirectory() as directory:
+                filepath = os.path.join(directory, "tuned.prm")
+                self._model.write(filepath)
+                # only the parameters chosen by the tuner, not the ones of the solver itself
+                ignored = {"TuneTimeLimit", "TuneResults", "TimeLimit", "Seed", "LazyConstraints", *self._params}
+                tuned = {
+                    param: value
+                    for param, value in read_param_file(filepath).items()
+                    if param not in ignored
+                }
+        self._reset_params()
+        return tuned
+
+    def dispose(self):
+        """
+        Frees the Gurobi model. The environment stays usable for further solvers.
+        """
+        self._model.dispose()
+
     def get_current_solution(self):
         projects = {project.id: [] for project in self.projects}
         roles = {student.matr_number: 0 for student in self.students}
@@ -112,7 +275,7 @@ class SepSolver:
             gp.GRB.MAXIMIZE,
         )
 
-        self._model.optimize()
+        self._optimize("rating")
 
         if self._model.status == GRB.OPTIMAL:
             self._model.addConstr(
@@ -124,7 +287,7 @@ class SepSolver:
                 gp.GRB.MAXIMIZE,
             )
 
-        self._model.optimize()
+        self._optimize("programming")
         if self._model.status == GRB.OPTIMAL:
             self._model.addConstr(
                 self._programmingObjective.get()
@@ -135,7 +298,7 @@ class SepSolver:
                 gp.GRB.MAXIMIZE,
             )
 
-        self._model.optimize()
+        self._optimize("friends")
         if self._model.status == GRB.OPTIMAL:
             self._model.addConstr(
                 self._friendsObjective.get()
@@ -146,7 +309,7 @@ class SepSolver:
                 gp.GRB.MINIMIZE,
             )
 
-        self._model.optimize()
+        self._optimize("opt_size")
         if self._model.status == GRB.OPTIMAL:
             self.current_best_solution = self.get_current_solution()
 
@@ -159,7 +322,7 @@ class SepSolver:
                 gp.GRB.MAXIMIZE
             )
 
-            self._model.optimize()
+            self._optimize("rating")
             if self._model.status == GRB.OPTIMAL:
                 self._model.addConstr(
                     self._ratingObjective.get()
@@ -174,7 +337,7 @@ class SepSolver:
                 gp.GRB.MAXIMIZE,
             )
 
-            self._model.optimize()
+            self._optimize("programming")
             if self._model.status == GRB.OPTIMAL:
                 self.current_best_solution = self.get_current_solution()
                 self._model.addConstr(
@@ -186,7 +349,7 @@ class SepSolver:
                 self._friendsObjective.get(),
                 gp.GRB.MAXIMIZE,
             )
-            self._model.optimize()
+            self._optimize("friends")
 
             if self._model.status == GRB.OPTIMAL:
                 self.current_best_solution = self.get_current_solution()
@@ -194,13 +357,12 @@ class SepSolver:
                 self._friendsObjective.get()
                     >= self._model.getObjective().getValue() * 0.99
                 )
-                self._model.optimize()
         elif self.current_objective == 3:
             self._model.setObjective(
                 self._optSizeObjective.get(),
                 gp.GRB.MINIMIZE,
             )
-            self._model.optimize()
+            self._optimize("opt_size")
             if self._model.status == GRB.OPTIMAL:
                 self.current_best_solution = self.get_current_solution()
         self.current_objective += 1
@@ -17,7 +17,8 @@ class _ProjectParticipationConstraint:
         for student in self._students:
             self._model.addConstr(
                 sum(self._studentProjectVars.all_projects_with_student(student=student))
-                == 1
+                == 1,
+                name=f"one_project_{student.matr_number}",
             )
 
     def _enforce_every_project_max_number_students(self):
@@ -27,7 +28,8 @@ class _ProjectParticipationConstraint:
         for project in self._projects:
             self._model.addConstr(
                 sum(self._studentProjectVars.all_students_with_project(project=project))
-                <= project.capacity
+                <= project.capacity,
+                name=f"capacity_{project.id}",
             )
 
     def _enforce_every_project_empty_or_has_minimum_number_students(self):
@@ -36,11 +38,13 @@ class _ProjectParticipationConstraint:
         for project in self._projects:
             self._model.addConstr(
                 sum(self._studentProjectVars.all_students_with_project(project))
-                <= self._emptyProjectVars.x(project) * project.capacity
+                <= self._emptyProjectVars.x(project) * project.capacity,
+                name=f"empty_max_{project.id}",
             )
             self._model.addConstr(
                 sum(self._studentProjectVars.all_students_with_project(project))
-                >= self._emptyProjectVars.x(project) * project.min_capacity
+                >= self._emptyProjectVars.x(project) * project.min_capacity,
+                name=f"empty_min_{project.id}",
             )
 
     def _enforce_vetos(self):
@@ -55,7 +59,8 @@ class _ProjectParticipationConstraint:
                         for student in project.veto
                     ]
                 )
-                == 0
+                == 0,
+                name=f"veto_{project.id}",
             )
 
 
@@ -109,7 +114,8 @@ class _StudentProgrammingConstraint:
             for project in self._projects:
                 self._model.addConstr(
                 sum(self._programmingVars.all_languages(student, project))
-                <= self._studentProjectVars.x(student, project)
+                <= self._studentProjectVars.x(student, project),
+                name=f"one_role_{student.matr_number}_{project.id}",
             )
 
     def _enforce_maximum_number_roles_project_assigned(self):
@@ -121,4 +127,5 @@ class _StudentProgrammingConstraint:
                 if project.programming_requirements[programming_language] is not None:
                     self._model.addConstr(
                         sum([self._programmingVars.x(programming_language, student, project) for student in self._students])
-                        <= project.programming_requirements[programming_language])
\ No newline at end of file
+                        <= project.programming_requirements[programming_language],
+                        name=f"roles_{project.id}_{programming_language}")
\ No newline at end of file
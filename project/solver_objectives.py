@@ -67,24 +67,85 @@ class _FriendsObjective:
         students: List[Student],
         projects: List[Project],
         studentProjectVars: _StudentProjectVars,
+        lazy: bool = False,
     ):
         self._students = students
         self._projects = projects
         self._studentProjectVars = studentProjectVars
+        self._lazy = lazy
 
         self.relations = []
+        # pairs whose linking constraints for the non-candidate projects are only added in the callback
+        self._lazy_relations = []
         # here get a list of all friend relations as tuple (Student.matr_number,Student.matr_number). Make sure no duplicates are added.
         for student in self._students:
             for friend in student.friends:
                 if friend != student.matr_number:
+                    if self._lazy:
+                        self._add_lazy_relation(model, student, friend)
+                        continue
                     for proj in self._projects:
                         relation = model.addVar(
-                            vtype=gp.GRB.BINARY, name=f"relation_{student.matr_number}_{friend}"
+                            vtype=gp.GRB.BINARY, name=f"relation_{student.matr_number}_{friend}_{proj.id}"
                         )
                         self.relations.append(relation)
                         model.addConstr(relation<=self._studentProjectVars.x_matr(student.matr_number, proj))
                         model.addConstr(relation<= self._studentProjectVars.x_matr(friend, proj))
 
+    def _add_lazy_relation(self, model, student: Student, friend: int):
+        """
+        The method only creates relation variables for the projects both friends rate positively. Being together in
+        any other project is covered by a single variable whose linking constraints are added lazily.
+        """
+        friend_student = self._studentProjectVars.matnr_students[friend]
+        candidates = []
+        others = []
+        for proj in self._projects:
+            if min(student.projects_ratings[proj.id], friend_student.projects_ratings[proj.id]) >= 3:
+                candidates.append(proj)
+            else:
+                others.append(proj)
+
+        for proj in candidates:
+            relation = model.addVar(
+                vtype=gp.GRB.BINARY, name=f"relation_{student.matr_number}_{friend}_{proj.id}"
+            )
+            self.relations.append(relation)
+            model.addConstr(relation <= self._studentProjectVars.x(student, proj))
+            model.addConstr(relation <= self._studentProjectVars.x(friend_student, proj))
+
+        if others:
+            relation = model.addVar(
+                vtype=gp.GRB.BINARY, name=f"relation_{student.matr_number}_{friend}_other"
+            )
+            self.relations.append(relation)
+            # the student has to be in one of the remaining projects, the friend is checked in the callback
+            model.addConstr(
+                relation <= sum(self._studentProjectVars.x(student, proj) for proj in others)
+            )
+            self._lazy_relations.append((relation, student, friend_student, others))
+
+    def callback(self, model, where):
+        """
+        Adds the violated linking constraints of the lazy friend relations for a new incumbent.
+        """
+        if where != gp.GRB.Callback.MIPSOL or not self._lazy_relations:
+            return
+        values = model.cbGetSolution([relation for relation, _, _, _ in self._lazy_relations])
+        for value, (relation, student, friend, others) in zip(values, self._lazy_relations):
+            if value < 0.5:
+                continue
+            student_vars = [self._studentProjectVars.x(student, proj) for proj in others]
+            friend_vars = [self._studentProjectVars.x(friend, proj) for proj in others]
+            student_values = model.cbGetSolution(student_vars)
+            friend_values = model.cbGetSolution(friend_vars)
+            for student_var, friend_var, student_value, friend_value in zip(
+                student_vars, friend_vars, student_values, friend_values
+            ):
+                if student_value > 0.5 and friend_value < 0.5:
+                    # if the student is in this project, the friend has to be in it as well
+                    model.cbLazy(relation <= 1 - student_var + friend_var)
+
     def get(self):
         # return sum of all friend relations
         return sum(
@@ -112,21 +173,22 @@ class _OptSizeOjective:
         self.abs_deviations = []
         for proj in self._projects:
             deviation = model.addVar(
-                            vtype=gp.GRB.INTEGER, name="deviation_of_"
+                            vtype=gp.GRB.INTEGER, name=f"deviation_of_{proj.id}"
                         )
 
             opt_size = int((proj.capacity + proj.min_capacity) / 2)
             model.addConstr(
-                deviation == sum(self._studentProjectVars.all_students_with_project(project=proj)) - opt_size
+                deviation == sum(self._studentProjectVars.all_students_with_project(project=proj)) - opt_size,
+                name=f"deviation_{proj.id}",
                 )
-            abs_deviation = model.addVar(vtype=gp.GRB.INTEGER, name="abs_deviation")
-            model.addConstr(abs_deviation == gp.abs_(deviation))
+            abs_deviation = model.addVar(vtype=gp.GRB.INTEGER, name=f"abs_deviation_{proj.id}")
+            model.addConstr(abs_deviation == gp.abs_(deviation), name=f"abs_deviation_{proj.id}")
             self.deviations.append(deviation)
             self.abs_deviations.append(abs_deviation)
-        self._maximum = model.addVar(vtype=gp.GRB.INTEGER, name="max")
-        for dev in self.abs_deviations:
+        self._maximum = model.addVar(vtype=gp.GRB.INTEGER, name="max_deviation")
+        for proj, dev in zip(self._projects, self.abs_deviations):
             #add constraints to make sure the maximum is >= to all deviations
-            model.addConstr(self._maximum >= dev)
+            model.addConstr(self._maximum >= dev, name=f"max_deviation_{proj.id}")
 
     # try to minimize the sum(deviation of every project from its optimal size)
     # try to minimize the single maximum deviation from a projects optimum. So minimize _maximum
@@ -0,0 +1,289 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from data_schema import Instance, Solution
+from solver_stages import STAGES
+
+# states of a job that will not change anymore
+FINISHED = ("done", "infeasible", "error")
+
+# seconds between two checks whether the workers are still alive
+LIVENESS_INTERVAL = 1.0
+
+
+def _worker(task_queue, event_queue, env_params):
+    """
+    Entry point of a worker process. The worker imports the solver and starts its Gurobi environment once
+    and then solves the instances from the task queue until it receives `None`.
+    """
+    env = None
+    startup_error = None
+    try:
+        import gurobipy as gp
+        from solver import SepSolver
+
+        env = gp.Env(params=env_params)
+    except Exception as e:
+        # e.g. no license or all seats in use, the jobs of this worker fail instead of waiting forever
+        startup_error = f"The worker could not start Gurobi: {e!r}"
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id, instance_json, options = task
+        event_queue.put((job_id, "running", os.getpid()))
+        if startup_error is not None:
+            event_queue.put((job_id, "error", startup_error))
+            continue
+        solver = None
+        try:
+            instance = Instance.model_validate_json(instance_json)
+            solver = SepSolver(instance, env=env, **options)
+            solution = None
+            for stage in STAGES:
+                solution = solver.solve_next_objective()
+                if solution is None:
+                    break
+                event_queue.put((job_id, "stage", stage))
+            if solution is None:
+                event_queue.put((job_id, "infeasible", None))
+            else:
+                event_queue.put(
+                    (job_id, "done", (solution.model_dump_json(), solver.stage_stats))
+                )
+        except Exception as e:
+            event_queue.put((job_id, "error", repr(e)))
+        finally:
+            if solver is not None:
+                solver.dispose()
+    if env is not None:
+        env.dispose()
+
+
+class SolverPool:
+    """
+    A pool of long-lived worker processes. Every worker holds a started Gurobi environment and the imported solver,
+    so a solve only pays for building and optimizing the model. The number of workers caps the number of
+    concurrently used licenses.
+    """
+
+    def __init__(self, workers: int = 1, env_params: Optional[Dict] = None):
+        context = mp.get_context("spawn")
+        self._task_queue = context.Queue()
+        self._event_queue = context.Queue()
+        self._jobs: Dict[str, Dict] = {}
+        self._condition = threading.Condition()
+
+        self._processes = [
+            context.Process(
+                target=_worker,
+                args=(self._task_queue, self._event_queue, env_params or {}),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self._collector = threading.Thread(target=self._collect_events, daemon=True)
+        self._collector.start()
+
+    def _collect_events(self):
+        """
+        Moves the events of the workers into the job table. Whenever no event arrives for a while, the jobs of
+        workers that died are marked as failed.
+        """
+        while True:
+            try:
+                event = self._event_queue.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                self._fail_jobs_of_dead_workers()
+                continue
+            if event is None:
+                break
+            job_id, kind, payload = event
+            with self._condition:
+                job = self._jobs[job_id]
+                if job["status"] in FINISHED:
+                    # e.g. a job that was cancelled by terminate() while its worker was still reporting
+                    continue
+                if kind == "running":
+                    job["worker"] = payload
+                    job["started"] = time.time()
+                    job["status"] = kind
+                elif kind == "stage":
+                    job["stage"] = payload
+                    job["progress"] = (STAGES.index(payload) + 1) / len(STAGES)
+                elif kind == "done":
+                    job["solution"], job["stage_stats"] = payload
+                    job["status"] = kind
+                elif kind == "error":
+                    job["error"] = payload
+                    job["status"] = kind
+                else:
+                    job["status"] = kind
+                if job["status"] in FINISHED:
+                    job["finished"] = time.time()
+                self._condition.notify_all()
+
+    def _fail_jobs_of_dead_workers(self):
+        """
+        Marks the running jobs of crashed workers (e.g. killed because they ran out of memory) as failed.
+        If no worker is left, the queued jobs fail as well.
+        """
+        dead = {
+            process.pid: process.exitcode
+            for process in self._processes
+            if not process.is_alive() and process.exitcode != 0
+        }
+        if not dead:
+            return
+        no_worker_left = not any(process.is_alive() for process in self._processes)
+        with self._condition:
+            for job in self._jobs.values():
+                if job["status"] == "running" and job["worker"] in dead:
+                    job["error"] = f"The worker process exited with code {dead[job['worker']]}."
+                    job["status"] = "error"
+                    job["finished"] = time.time()
+                elif job["status"] == "queued" and no_worker_left:
+                    job["error"] = "All worker processes exited."
+                    job["status"] = "error"
+                    job["finished"] = time.time()
+            self._condition.notify_all()
+
+    def submit(self, instance: Union[Instance, str], **options) -> str:
+        """
+        Queues an instance (model or JSON) for solving and returns the id of the job.
+        The options are passed to the `SepSolver`.
+        """
+        instance_json = (
+            instance.model_dump_json() if isinstance(instance, Instance) else instance
+        )
+        job_id = uuid.uuid4().hex
+        with self._condition:
+            self._jobs[job_id] = {
+                "status": "queued",
+                "stage": None,
+                "progress": 0.0,
+                "solution": None,
+                "stage_stats": None,
+                "error": None,
+                "worker": None,
+                # time.time() when a worker took the job and when it finished
+                "started": None,
+                "finished": None,
+            }
+        self._task_queue.put((job_id, instance_json, options))
+        return job_id
+
+    def status(self, job_id: str) -> Dict:
+        """
+        Returns a copy of the state of the job.
+        """
+        with self._condition:
+            return dict(self._jobs[job_id])
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict:
+        """
+        Blocks until the job is finished or the timeout is reached and returns its state.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._jobs[job_id]["status"] in FINISHED, timeout=timeout
+            )
+            return dict(self._jobs[job_id])
+
+    def as_completed(
+        self, job_ids: Iterable[str], timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Yields the ids of the jobs in the order they finish. Raises a `TimeoutError` if no job finishes
+        within the timeout.
+        """
+        pending = set(job_ids)
+        while pending:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: any(self._jobs[job_id]["status"] in FINISHED for job_id in pending),
+                    timeout=timeout,
+                )
+                finished = [
+                    job_id for job_id in pending if self._jobs[job_id]["status"] in FINISHED
+                ]
+            if not finished:
+                raise TimeoutError(f"{len(pending)} jobs did not finish in time.")
+            for job_id in finished:
+                pending.discard(job_id)
+                yield job_id
+
+    def forget(self, job_id: str) -> bool:
+        """
+        Removes a finished job and its solution from the pool. Returns whether the job was removed.
+        """
+        with self._condition:
+            if self._jobs[job_id]["status"] not in FINISHED:
+                return False
+            del self._jobs[job_id]
+            return True
+
+    def solution(self, job_id: str) -> Optional[Solution]:
+        """
+        Returns the solution of a finished job or `None`.
+        """
+        solution_json = self.status(job_id)["solution"]
+        if solution_json is None:
+            return None
+        return Solution.model_validate_json(solution_json)
+
+    def close(self):
+        """
+        Stops the workers after the queued jobs are done.
+        """
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join()
+        self._event_queue.put(None)
+        self._collector.join()
+
+    def terminate(self):
+        """
+        Stops the workers without waiting for the queued and running jobs, which fail as cancelled.
+        """
+        while True:
+            try:
+                self._task_queue.get_nowait()
+            except queue.Empty:
+                break
+        with self._condition:
+            for job in self._jobs.values():
+                if job["status"] not in FINISHED:
+                    job["error"] = "The job was cancelled."
+                    job["status"] = "error"
+                    job["finished"] = time.time()
+            self._condition.notify_all()
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        # a killed worker may leave the queues in an undefined state, so nothing waits for them at exit
+        self._task_queue.cancel_join_thread()
+        self._event_queue.cancel_join_thread()
+        self._event_queue.put(None)
+        self._collector.join(timeout=2 * LIVENESS_INTERVAL)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # on an error, or when a generator using the pool is closed early, the remaining jobs are not waited for
+        if exc_type is not None:
+            self.terminate()
+        else:
+            self.close()
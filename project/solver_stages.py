@@ -0,0 +1,3 @@
+# names of the lexicographic optimization stages of the SepSolver in the order they are solved. They live in their
+# own module, so the solver pool and the benchmark runner can use them without importing gurobipy.
+STAGES = ["rating", "programming", "friends", "opt_size"]
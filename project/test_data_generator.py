@@ -1,9 +1,13 @@
+import argparse
 import math
+import os
 import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 from data_schema import Instance, Project, Student
-from ortools.sat.python import cp_model
+from rating_probabilities import calculate_rating_probabilities
 
 
 class Generator:
@@ -210,51 +214,7 @@ class Generator:
         }
 
     def calculateRatingProbabilities(self, average_rating):
-        model = cp_model.CpModel()
-        # define variables for probabilities, elevate the upper bound because we are working with integers
-        p1 = model.NewIntVar(0, 100, "p1")
-        p2 = model.NewIntVar(0, 100, "p2")
-        p3 = model.NewIntVar(0, 100, "p3")
-        p4 = model.NewIntVar(0, 100, "p4")
-        p5 = model.NewIntVar(0, 100, "p5")
-        # ensure that probabilities add up to 1
-        model.Add(p1 + p2 + p3 + p4 + p5 == 100)
-        # ensure that probabilities are not to small
-        model.Add(p1 >= 10)
-        model.Add(p2 >= 10)
-        model.Add(p3 >= 10)
-        model.Add(p4 >= 10)
-        model.Add(p5 >= 10)
-        # minimize distance between sum of weighted probabilities and average_rating
-        difference = model.NewIntVar(-10000, 10000, "difference")
-        abs_difference = model.NewIntVar(0, 10000, "abs_difference")
-        model.Add(
-            difference
-            == (1 * p1 + 2 * p2 + 3 * p3 + 4 * p4 + 5 * p5) - int(average_rating * 100)
-        )
-        model.AddAbsEquality(abs_difference, difference)
-        model.Minimize(abs_difference)
-        # solve model, return prababilities as a list
-        solver = cp_model.CpSolver()
-        status = solver.Solve(model)
-        probabilities = []
-        # if feasible, return the probabillities of each rating
-        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            total = (
-                solver.Value(p1)
-                + solver.Value(p2)
-                + solver.Value(p3)
-                + solver.Value(p4)
-                + solver.Value(p5)
-            )
-            probabilities = [
-                solver.Value(p1) / total,
-                solver.Value(p2) / total,
-                solver.Value(p3) / total,
-                solver.Value(p4) / total,
-                solver.Value(p5) / total,
-            ]
-        return probabilities
+        return calculate_rating_probabilities(average_rating)
 
     def generateInstance(self, number_projects, number_students):
         self.sumProjectsCapacity = 0
@@ -271,20 +231,62 @@ class Generator:
         return self.instance
 
 
-g = Generator()
+INSTANCE_SIZES = [(10, 100), (20, 200), (30, 300), (50, 500), (100, 1000), (50, 1000)]
 
-instance_sizes = [(10, 100), (20, 200), (30, 300), (50, 500), (100, 1000), (50, 1000)]
 
-for instance_size in instance_sizes:
-    number_projects, number_students = instance_size
-    data = g.generateInstance(
+def generate_instance_file(number_projects, number_students, seed, directory="instances"):
+    """
+    Generates, validates and atomically writes one instance. Runs in a worker process of main().
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    data = Generator().generateInstance(
         number_students=number_students, number_projects=number_projects
     ).model_dump_json(indent=2)
-    with open(f"instances/data_s{number_students}_g{number_projects}.json", "w") as f:
-        f.write(data)
-
-    with open(f"instances/data_s{number_students}_g{number_projects}.json") as f:
-        test = f.read()
-        instance: Instance = Instance.model_validate_json(test)
-        assert len(instance.projects) == number_projects
-        assert len(instance.students) == number_students
+
+    instance: Instance = Instance.model_validate_json(data)
+    assert len(instance.projects) == number_projects
+    assert len(instance.students) == number_students
+
+    # write to a temporary file in the same directory first, so no half written instance is ever visible
+    filepath = os.path.join(directory, f"data_s{number_students}_g{number_projects}.json")
+    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+        try:
+            f.write(data)
+        except BaseException:
+            # e.g. a full disk, the partial file is not replaced into place and would stay behind
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, filepath)
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the test instances in parallel.")
+    parser.add_argument(
+        "--sizes",
+        nargs="*",
+        default=[f"{p}:{s}" for p, s in INSTANCE_SIZES],
+        help="instance sizes as <projects>:<students>",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0, help="the i-th instance uses seed + i")
+    parser.add_argument("--out-dir", default="instances")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    sizes = [tuple(int(number) for number in size.split(":")) for size in args.sizes]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(
+                generate_instance_file, number_projects, number_students, args.seed + i, args.out_dir
+            )
+            for i, (number_projects, number_students) in enumerate(sizes)
+        ]
+        for future in as_completed(futures):
+            print(f"Generated {future.result()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import glob
+import os
+import random
+import statistics
+
+from data_schema import Instance
+from gurobipy import GRB
+from solver import STAGES, SepSolver
+
+# Tunes the Gurobi parameters of every SEP stage over a set of instances. Candidates are sampled randomly
+# (optionally seeded with the results of Gurobi's tuner) and evaluated with several seeds on all instances.
+# The best parameter set of a stage is written to <out-dir>/<stage>.prm, which SepSolver loads with
+# load_stage_params(<out-dir>). A markdown report compares the times with the default parameters.
+#
+# usage: python tune_params.py --trials 20 --seeds 3 --out-dir params
+
+SEARCH_SPACE = {
+    "MIPFocus": [0, 1, 2, 3],
+    "Presolve": [-1, 0, 1, 2],
+    "Cuts": [-1, 0, 1, 2, 3],
+    "Heuristics": [0.0, 0.01, 0.05, 0.1, 0.2, 0.5],
+}
+
+
+def random_candidate(rng: random.Random):
+    return {param: rng.choice(values) for param, values in SEARCH_SPACE.items()}
+
+
+def write_param_file(filepath: str, params):
+    with open(filepath, "w") as f:
+        for param, value in params.items():
+            f.write(f"{param} {value}\n")
+
+
+class StageEvaluator:
+    """
+    Solves the stages before the tuned stage once per instance and then times the tuned stage for every
+    parameter candidate and seed on the same model.
+    """
+
+    def __init__(self, filepaths, stage: str, time_limit: float):
+        self.stage = stage
+        self.time_limit = time_limit
+        self.solvers = []
+        for filepath in filepaths:
+            with open(filepath) as f:
+                instance: Instance = Instance.model_validate_json(f.read())
+            solver = SepSolver(instance, params={"OutputFlag": 0})
+            feasible = True
+            for _ in range(STAGES.index(stage)):
+                if solver.solve_next_objective() is None:
+                    feasible = False
+                    break
+            if feasible:
+                self.solvers.append((filepath, solver))
+            else:
+                solver.dispose()
+
+    def run_time(self, params, seed: int) -> float:
+        """
+        Returns the mean stage time over all instances. Solves hitting the time limit count twice the limit.
+        """
+        times = []
+        for _, solver in self.solvers:
+            stats = solver.solve_stage(self.stage, {**params, "Seed": seed, "TimeLimit": self.time_limit})
+            if stats["status"] == GRB.OPTIMAL:
+                times.append(stats["runtime"])
+            else:
+                times.append(2 * self.time_limit)
+        return statistics.mean(times) if times else 0.0
+
+    def score(self, params, seeds) -> float:
+        return statistics.mean(self.run_time(params, seed) for seed in seeds)
+
+    def gurobi_tuner_candidates(self, tune_time_limit: float):
+        """
+        Runs Gurobi's tuner on every instance and returns the best parameter sets it found.
+        """
+        candidates = []
+        for _, solver in self.solvers:
+            tuned = solver.tune_stage(self.stage, tune_time_limit)
+            if tuned:
+                candidates.append(tuned)
+        return candidates
+
+    def dispose(self):
+        for _, solver in self.solvers:
+            solver.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the Gurobi parameters of the SEP stages.")
+    parser.add_argument("instances", nargs="*", help="instance files, default: ./instances/*.json")
+    parser.add_argument("--stages", nargs="*", default=STAGES, choices=STAGES)
+    parser.add_argument("--trials", type=int, default=20, help="number of random candidates per stage")
+    parser.add_argument("--seeds", type=int, default=3, help="number of Gurobi seeds per candidate")
+    parser.add_argument("--time-limit", type=float, default=60, help="time limit per stage solve in seconds")
+    parser.add_argument("--gurobi-tuner", type=float, default=0, help="additionally run Gurobi's tuner for this many seconds per instance")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="params")
+    args = parser.parse_args()
+
+    filepaths = args.instances or sorted(glob.glob("./instances/*.json"))
+    seeds = list(range(args.seeds))
+    rng = random.Random(args.random_seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    report = [
+        "# Parameter tuning report",
+        "",
+        f"Instances: {', '.join(os.path.basename(filepath) for filepath in filepaths)}  ",
+        f"Seeds: {args.seeds}, candidates per stage: {args.trials}, time limit: {args.time_limit} s",
+        "",
+        "| stage | default [s] | tuned [s] | improvement | parameters |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for stage in args.stages:
+        evaluator = StageEvaluator(filepaths, stage, args.time_limit)
+        default_time = evaluator.score({}, seeds)
+        print(f"{stage}: default parameters {default_time:.2f}s")
+
+        candidates = [random_candidate(rng) for _ in range(args.trials)]
+        if args.gurobi_tuner > 0:
+            candidates = evaluator.gurobi_tuner_candidates(args.gurobi_tuner) + candidates
+
+        best_params, best_time = {}, default_time
+        for params in candidates:
+            time = evaluator.score(params, seeds)
+            print(f"{stage}: {params} {time:.2f}s")
+            if time < best_time:
+                best_params, best_time = params, time
+        evaluator.dispose()
+
+        filepath = os.path.join(args.out_dir, f"{stage}.prm")
+        if best_params:
+            write_param_file(filepath, best_params)
+        elif os.path.exists(filepath):
+            # the defaults are the fastest, an old parameter file must not be used anymore
+            os.remove(filepath)
+
+        improvement = (1 - best_time / default_time) * 100 if default_time > 0 else 0.0
+        parameters = ", ".join(f"{param}={value}" for param, value in best_params.items()) or "defaults"
+        report.append(
+            f"| {stage} | {default_time:.2f} | {best_time:.2f} | {improvement:.1f} % | {parameters} |"
+        )
+
+    with open(os.path.join(args.out_dir, "tuning_report.md"), "w") as f:
+        f.write("\n".join(report) + "\n")
+    print("\n".join(report))
+
+
+if __name__ == "__main__":
+    main()
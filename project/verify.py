@@ -1,57 +1,37 @@
+import os
+
 from _alglab_utils import CHECK, main, mandatory_testcase
 from data_schema import Instance
+from instance_loader import load_instance
+from solution_io import write_solution
+from solution_verifier import verify_solution
 from solver import SepSolver
 
 
+def save_solution(instance: Instance, solution):
+    # the solutions are outputs of this script and not part of the repository
+    os.makedirs("solution", exist_ok=True)
+    write_solution(solution, f"solution/solution_of_{len(instance.projects)}_{len(instance.students)}.jsonl")
+
+
 def solve_sep_instance(filepath: str):
-    with open(filepath) as f:
-        instance: Instance = Instance.model_validate_json(f.read())
+    instance: Instance = load_instance(filepath)
 
     solver = SepSolver(instance)
     solution = solver.solve()
 
     CHECK(solution is not None, "The returned solution must not be 'None'!")
 
-    # check every project has a mimium and maximum number of participants or is empty
-    for project in solution.projects:
-        CHECK(
-            len(solution.projects[project]) <= instance.projects[project].capacity,
-            f"Too many students in project: {project}!",
-        )
-        CHECK(
-            len(solution.projects[project]) == 0
-            or len(solution.projects[project])
-            >= instance.projects[project].min_capacity,
-            f"Project {project} has {len(solution.projects[project])} students with less then the minimum required of {instance.projects[project].min_capacity}!",
-        )
-        # check if solution complies with project vetos
-        for student_solution in solution.projects[project]:
-            CHECK(
-                student_solution not in instance.projects[project].veto,
-                f"The returned solution contains a prohibited student {student_solution.matr_number} in project {project}!",
-            )
-
-    # check if every student is contained in exactly one project
-    for student_instance in instance.students:
-        count_student_in_solution = 0
-        for project in solution.projects:
-            for student_solution in solution.projects[project]:
-                if student_instance.matr_number == student_solution.matr_number:
-                    count_student_in_solution += 1
-        CHECK(
-            count_student_in_solution == 1,
-            f"The returned solution contains a student {student_instance} {count_student_in_solution} times!",
-        )
-
-    data = solution.model_dump_json(indent=2)
-    with open(f"solution/solution_of_{len(instance.projects)}_{len(instance.students)}.json", "w") as f:
-        f.write(data)
+    # check capacities, vetos and that every student is in exactly one project
+    violations = verify_solution(instance, solution)
+    CHECK(not violations, "\n".join(violation.message for violation in violations))
+
+    save_solution(instance, solution)
 
     return instance, solution
 
 def genererate_solver(filepath: str):
-    with open(filepath) as f:
-        instance: Instance = Instance.model_validate_json(f.read())
+    instance: Instance = load_instance(filepath)
 
     solver = SepSolver(instance)
 
@@ -62,41 +42,12 @@ def solve_next_objective(solver: SepSolver, instance: Instance):
 
     #CHECK(solution is not None, "The returned solution must not be 'None'!")
 
-    # check every project has a mimium and maximum number of participants or is empty
+    # check capacities, vetos and that every student is in exactly one project
     if solution is not None:
-        for project in solution.projects:
-            CHECK(
-                len(solution.projects[project]) <= instance.projects[project].capacity,
-                f"Too many students in project: {project}!",
-            )
-            CHECK(
-                len(solution.projects[project]) == 0
-                or len(solution.projects[project])
-                >= instance.projects[project].min_capacity,
-                f"Project {project} has {len(solution.projects[project])} students with less then the minimum required of {instance.projects[project].min_capacity}!",
-            )
-            # check if solution complies with project vetos
-            for student_solution in solution.projects[project]:
-                CHECK(
-                    student_solution not in instance.projects[project].veto,
-                    f"The returned solution contains a prohibited student {student_solution.matr_number} in project {project}!",
-                )
-
-        # check if every student is contained in exactly one project
-        for student_instance in instance.students:
-            count_student_in_solution = 0
-            for project in solution.projects:
-                for student_solution in solution.projects[project]:
-                    if student_instance.matr_number == student_solution.matr_number:
-                        count_student_in_solution += 1
-            CHECK(
-                count_student_in_solution == 1,
-                f"The returned solution contains a student {student_instance} {count_student_in_solution} times!",
-            )
-    
-        data = solution.model_dump_json(indent=2)
-        with open(f"solution/solution_of_{len(instance.projects)}_{len(instance.students)}.json", "w") as f:
-            f.write(data)
+        violations = verify_solution(instance, solution)
+        CHECK(not violations, "\n".join(violation.message for violation in violations))
+
+        save_solution(instance, solution)
 
     return solution
 
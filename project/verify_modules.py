@@ -0,0 +1,304 @@
+import os
+import tempfile
+
+import numpy as np
+from _alglab_utils import CHECK, main, mandatory_testcase
+from instance_arrays import InstanceArrays
+from instance_loader import load_instance
+from local_search import improve, search_from_solution
+from solution_verifier import verify_solution
+
+# Checks of the modules around the solver: post-optimization, file formats, generators and the registration
+# store. They run like the instance checks in verify.py, every check in its own subprocess.
+#
+# usage: python verify_modules.py
+#        python verify_modules.py local_search_improves
+
+
+def _objective_key(arrays, solution):
+    # lexicographic order of the solver objectives, the deviation from the optimal size is minimized; the
+    # programming objective is taken from the roles of the solution, not from the roles the search recovers
+    rating, _, friends, max_deviation = search_from_solution(arrays, solution).objective()
+    return rating, sum(solution.roles.values()), friends, -max_deviation
+
+
+@mandatory_testcase(max_runtime_s=120)
+def local_search_improves():
+    from solver import SepSolver
+
+    instance = load_instance("./instances/data_s200_g20.json")
+    solution = SepSolver(instance).solve()
+    CHECK(solution is not None, "The solver found no solution to improve!")
+
+    arrays = InstanceArrays.from_instance(instance)
+    improved = improve(instance, solution, time_limit=20)
+
+    violations = verify_solution(instance, improved)
+    CHECK(not violations, "\n".join(violation.message for violation in violations))
+    before = _objective_key(arrays, solution)
+    after = _objective_key(arrays, improved)
+    CHECK(after >= before, f"The local search made the solution worse: {before} -> {after}")
+
+
+@mandatory_testcase(max_runtime_s=60)
+def local_search_keeps_roles():
+    import random
+
+    from data_schema import CompactSolution
+
+    instance = load_instance("./instances/data_s200_g20.json")
+    arrays = InstanceArrays.from_instance(instance)
+    project_ids = list(instance.projects)
+    projects = [project_ids[i % len(project_ids)] for i in range(len(instance.students))]
+
+    # valid roles in a random order, so the positions are not taken in the order the search recovers them
+    rng = random.Random(0)
+    free = {project_id: dict(project.programming_requirements) for project_id, project in instance.projects.items()}
+    roles = {}
+    for i in rng.sample(range(len(instance.students)), len(instance.students)):
+        student = instance.students[i]
+        languages = [
+            language
+            for language, number in free[projects[i]].items()
+            if number > 0 and student.programming_language_ratings.get(language, 0) > 0
+        ]
+        if languages:
+            language = rng.choice(languages)
+            free[projects[i]][language] -= 1
+            roles[student.matr_number] = student.programming_language_ratings[language]
+    solution = CompactSolution(
+        matr_numbers=[student.matr_number for student in instance.students],
+        projects=projects,
+        roles=[roles.get(student.matr_number, 0) for student in instance.students],
+    ).to_solution(instance)
+
+    recovered = search_from_solution(arrays, solution).objective()[1]
+    CHECK(
+        recovered == sum(solution.roles.values()),
+        f"The search recovered roles worth {recovered} of {sum(solution.roles.values())}!",
+    )
+    before = _objective_key(arrays, solution)
+    after = _objective_key(arrays, improve(instance, solution, time_limit=10))
+    CHECK(after >= before, f"The local search made the solution worse: {before} -> {after}")
+
+
+
+@mandatory_testcase(max_runtime_s=60)
+def columnar_round_trip():
+    from columnar_format import load_instance_arrays, read_columnar, write_columnar
+
+    instance = load_instance("./instances/data_s300_g30.json", trusted=False)
+    expected = InstanceArrays.from_instance(instance)
+    with tempfile.TemporaryDirectory() as directory:
+        write_columnar(instance, directory)
+        arrays = load_instance_arrays(directory)
+        for name in ("matr_numbers", "project_ids", "ratings", "skills", "requirements", "friends",
+                     "capacity", "min_capacity", "veto"):
+            CHECK(
+                np.array_equal(getattr(arrays, name), getattr(expected, name)),
+                f"The column {name} differs after the columnar round trip!",
+            )
+        CHECK(arrays.languages == expected.languages, "The languages differ after the columnar round trip!")
+        CHECK(read_columnar(directory) == instance, "The instance differs after the columnar round trip!")
+
+
+
+@mandatory_testcase(max_runtime_s=30)
+def solution_file_round_trip():
+    from data_schema import CompactSolution
+    from solution_io import read_full_solution, read_solution, write_solution
+
+    instance = load_instance("./instances/data_s100_g10.json")
+    project_ids = list(instance.projects)
+    # any assignment will do, the file format does not check feasibility
+    compact = CompactSolution(
+        matr_numbers=[student.matr_number for student in instance.students],
+        projects=[project_ids[i % len(project_ids)] for i in range(len(instance.students))],
+        roles=[i % 5 for i in range(len(instance.students))],
+    )
+    solution = compact.to_solution(instance)
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "solution.jsonl")
+        write_solution(solution, filepath)
+        # a full solution is written grouped by project
+        CHECK(
+            read_solution(filepath) == CompactSolution.from_solution(solution),
+            "The compact solution differs after the round trip!",
+        )
+        CHECK(read_full_solution(filepath, instance) == solution, "The solution differs after the round trip!")
+    for student in instance.students:
+        CHECK(
+            solution.get_proj_for_student(student) == compact.project_of(student.matr_number),
+            f"The project of student {student.matr_number} differs between the solution formats!",
+        )
+
+
+
+@mandatory_testcase(max_runtime_s=120)
+def rating_probabilities_optimal():
+    from ortools.sat.python import cp_model
+    from rating_probabilities import calculate_rating_probabilities
+
+    # the CP-SAT model the probabilities were computed with before, only its optimal distance is compared
+    def optimal_distance(target):
+        model = cp_model.CpModel()
+        percentages = [model.NewIntVar(10, 100, f"p{rating}") for rating in range(1, 6)]
+        model.Add(sum(percentages) == 100)
+        abs_difference = model.NewIntVar(0, 10000, "abs_difference")
+        model.AddAbsEquality(
+            abs_difference,
+            sum(rating * p for rating, p in zip(range(1, 6), percentages)) - target,
+        )
+        model.Minimize(abs_difference)
+        solver = cp_model.CpSolver()
+        CHECK(solver.Solve(model) == cp_model.OPTIMAL, f"CP-SAT found no optimum for {target}!")
+        return solver.Value(abs_difference)
+
+    for value in range(100, 501):
+        average_rating = value / 100
+        # the target of the CP-SAT model, e.g. int(2.01 * 100) == 200
+        target = int(average_rating * 100)
+        percentages = [round(probability * 100) for probability in calculate_rating_probabilities(average_rating)]
+        CHECK(sum(percentages) == 100, f"The probabilities for {average_rating} do not add up to 1!")
+        CHECK(min(percentages) >= 10, f"A probability for {average_rating} is below 10 %!")
+        distance = abs(sum(rating * p for rating, p in zip(range(1, 6), percentages)) - target)
+        CHECK(
+            distance == optimal_distance(target),
+            f"The probabilities for {average_rating} are not optimal: distance {distance}",
+        )
+
+
+
+@mandatory_testcase(max_runtime_s=60)
+def registration_store_matches_combine_data():
+    from combine_data import combine_data
+    from data_schema import Instance
+    from registration_store import RegistrationStore, import_json_directories
+
+    instance = load_instance("./instances/data_s100_g10.json")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # both read the registration files relative to the working directory
+        os.chdir(directory)
+        try:
+            for subdirectory in ("instances/students", "instances/projects"):
+                os.makedirs(subdirectory)
+            for student in instance.students:
+                with open(f"instances/students/{student.matr_number}.json", "w") as f:
+                    f.write(student.model_dump_json())
+            for project in instance.projects.values():
+                with open(f"instances/projects/{project.id}.json", "w") as f:
+                    f.write(project.model_dump_json())
+
+            combine_data()
+            combined = load_instance("instances/SEP_data.json")
+            store = RegistrationStore("instances/registrations.db")
+            import_json_directories(store)
+            exported = store.export_instance()
+            store.close()
+        finally:
+            os.chdir(cwd)
+
+    def by_matr_number(instance: Instance):
+        return Instance.model_construct(
+            students=sorted(instance.students, key=lambda student: student.matr_number),
+            projects=instance.projects,
+        )
+
+    CHECK(
+        by_matr_number(exported) == by_matr_number(combined),
+        "The registration store exports a different instance than combine_data!",
+    )
+
+
+
+@mandatory_testcase(max_runtime_s=60)
+def fast_generator_validates():
+    from fast_data_generator import FastGenerator
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "data_s1000_g50.json")
+        FastGenerator(seed=1).write_instance(filepath, number_projects=50, number_students=1000)
+        instance = load_instance(filepath, trusted=False)
+    CHECK(len(instance.students) == 1000, "The generated instance has the wrong number of students!")
+    CHECK(len(instance.projects) == 50, "The generated instance has the wrong number of projects!")
+
+
+
+@mandatory_testcase(max_runtime_s=60)
+def trusted_load_matches_validation():
+    import json
+    import shutil
+
+    from pydantic import ValidationError
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "data_s300_g30.json")
+        shutil.copy("./instances/data_s300_g30.json", filepath)
+        validated = load_instance(filepath)
+        trusted = load_instance(filepath)
+        CHECK(trusted == validated, "The trusted load differs from the validated one!")
+        CHECK(trusted == load_instance(filepath, trusted=False), "The trusted load differs from the validated one!")
+
+        # a changed file is validated again
+        with open(filepath) as f:
+            data = json.load(f)
+        data["students"][0]["projects_ratings"]["0"] = 9
+        with open(filepath, "w") as f:
+            json.dump(data, f)
+        try:
+            load_instance(filepath)
+        except ValidationError:
+            pass
+        else:
+            CHECK(False, "A changed instance file was trusted without validation!")
+
+
+
+@mandatory_testcase(max_runtime_s=60)
+def metrics_match_loops():
+    import random
+
+    from data_schema import CompactSolution
+    from metrics import Metrics
+
+    instance = load_instance("./instances/data_s300_g30.json")
+    project_ids = list(instance.projects)
+    rng = random.Random(0)
+    # some students stay unassigned and some projects empty, both have to be handled
+    assigned = [student for student in instance.students if rng.random() < 0.9]
+    compact = CompactSolution(
+        matr_numbers=[student.matr_number for student in assigned],
+        projects=[rng.choice(project_ids[:-3]) for _ in assigned],
+        roles=[rng.randint(0, 4) for _ in assigned],
+    )
+    solution = compact.to_solution(instance)
+    metrics = Metrics(instance, solution)
+
+    histogram = [0] * 5
+    for project_id, students in solution.projects.items():
+        for student in students:
+            histogram[student.projects_ratings[project_id] - 1] += 1
+    CHECK(metrics.rating_histogram.tolist() == histogram, "The rating histogram differs from the loop!")
+
+    for j, project_id in enumerate(metrics.project_ids.tolist()):
+        students = solution.projects[project_id]
+        CHECK(metrics.sizes[j] == len(students), f"The size of project {project_id} differs from the loop!")
+        average = sum(student.projects_ratings[project_id] for student in students) / max(len(students), 1)
+        CHECK(
+            np.isclose(metrics.avg_project_rating[j], average),
+            f"The average rating of project {project_id} differs from the loop!",
+        )
+
+    project_of = {student.matr_number: compact.project_of(student.matr_number) for student in instance.students}
+    satisfied = sum(
+        1
+        for student in instance.students
+        for friend in student.friends
+        if project_of[student.matr_number] is not None and project_of[student.matr_number] == project_of[friend]
+    )
+    CHECK(metrics.friends_satisfied == satisfied, "The number of satisfied friendships differs from the loop!")
+
+
+if __name__ == "__main__":
+    main()
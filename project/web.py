@@ -1,14 +1,14 @@
-import json
-import os
 import re
-from pathlib import Path
 
 import streamlit as st
-from data_schema import Student
+from registration_cache import get_projects, get_store
 from streamlit.components.v1 import html
 
 
 def create_student():
+    # imported on the first registration, so the form renders without loading pydantic
+    from data_schema import Student
+
     try:
         friends = []
         if matr_number_first_friend != "":
@@ -16,7 +16,7 @@ def create_student():
         if matr_number_second_friend != "":
             friends.append(int(matr_number_second_friend))
 
-        data = Student(
+        student = Student(
             last_name=last_name,
             first_name=first_name,
             matr_number=int(matr_number),
@@ -29,12 +29,8 @@ def create_student():
                 "PHP": int(php),
             },
             friends=friends,
-        ).model_dump_json(indent=2)
-
-        path = Path("instances/students")
-        path.mkdir(parents=True, exist_ok=True)
-        with open(f"instances/students/data_{matr_number}.json", "w") as f:
-            f.write(data)
+        )
+        get_store().add_student(student)
 
         # comment this section if you do not want to refresh your page to input new values
         #message = """
@@ -108,25 +104,13 @@ with st.form("my_form"):
 
     # list all available projects
     projects_ratings = {}
-    directory = 'instances/projects'
-    file_names = os.listdir(directory)
-    file_names.sort()
-    for filename in file_names:
-        print(filename)
-        if filename.endswith('.json'):
-            filepath = os.path.join(directory, filename)
-            with open(filepath) as file:
-                project_data = json.load(file)
-                project_name = project_data["name"]
-                project_capacity = project_data["capacity"]
-                project_min_capacity = project_data["min_capacity"]
-                project_id = project_data["id"]
+    for project in get_projects():
         projects_rating = st.radio(
-            f"Projekt {project_name} ({project_min_capacity} bis {project_capacity} Studierende)",
+            f"Projekt {project['name']} ({project['min_capacity']} bis {project['capacity']} Studierende)",
             options=["1", "2", "3", "4", "5"],
             horizontal=True,
         )
-        projects_ratings[project_id] = int(projects_rating)
+        projects_ratings[project["id"]] = int(projects_rating)
 
     submitted = st.form_submit_button("Absenden")
     if submitted and validate_inputs(first_name, last_name, matr_number, matr_number_first_friend, matr_number_second_friend):
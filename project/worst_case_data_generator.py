@@ -3,7 +3,7 @@ import random
 
 import numpy as np
 from data_schema import Instance, Project, Student
-from ortools.sat.python import cp_model
+from rating_probabilities import calculate_rating_probabilities
 
 
 class Generator:
@@ -133,51 +133,7 @@ class Generator:
         }
 
     def calculateRatingProbabilities(self, average_rating):
-        model = cp_model.CpModel()
-        # define variables for probabilities, elevate the upper bound because we are working with integers
-        p1 = model.NewIntVar(0, 100, "p1")
-        p2 = model.NewIntVar(0, 100, "p2")
-        p3 = model.NewIntVar(0, 100, "p3")
-        p4 = model.NewIntVar(0, 100, "p4")
-        p5 = model.NewIntVar(0, 100, "p5")
-        # ensure that probabilities add up to 1
-        model.Add(p1 + p2 + p3 + p4 + p5 == 100)
-        # ensure that probabilities are not to small
-        model.Add(p1 >= 10)
-        model.Add(p2 >= 10)
-        model.Add(p3 >= 10)
-        model.Add(p4 >= 10)
-        model.Add(p5 >= 10)
-        # minimize distance between sum of weighted probabilities and average_rating
-        difference = model.NewIntVar(-10000, 10000, "difference")
-        abs_difference = model.NewIntVar(0, 10000, "abs_difference")
-        model.Add(
-            difference
-            == (1 * p1 + 2 * p2 + 3 * p3 + 4 * p4 + 5 * p5) - int(average_rating * 100)
-        )
-        model.AddAbsEquality(abs_difference, difference)
-        model.Minimize(abs_difference)
-        # solve model, return prababilities as a list
-        solver = cp_model.CpSolver()
-        status = solver.Solve(model)
-        probabilities = []
-        # if feasible, return the probabillities of each rating
-        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            total = (
-                solver.Value(p1)
-                + solver.Value(p2)
-                + solver.Value(p3)
-                + solver.Value(p4)
-                + solver.Value(p5)
-            )
-            probabilities = [
-                solver.Value(p1) / total,
-                solver.Value(p2) / total,
-                solver.Value(p3) / total,
-                solver.Value(p4) / total,
-                solver.Value(p5) / total,
-            ]
-        return probabilities
+        return calculate_rating_probabilities(average_rating)
 
     def generateNormalStudents(self, number_students):
         students = []